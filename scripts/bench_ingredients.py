@@ -0,0 +1,75 @@
+"""Script to benchmark ingredient parsing throughput."""
+
+import random
+import sys
+import time
+
+from recipito.ingredients import parse_ingredient
+from recipito.ingredients import parse_ingredients
+
+QUANTITIES = ["1", "2", "3", "1/2", "1/4", "3/4", "1 1/2", "2-3", "½", "¾", "1½", "2¾", "1.5", "250", "500", ""]
+UNITS = ["cup", "cups", "tbsp", "Tbsp.", "T", "tsp", "t", "oz", "lb", "g", "ml", "cloves", "can", "pinch", ""]
+NAMES = [
+    "all-purpose flour",
+    "granulated sugar",
+    "brown sugar",
+    "unsalted butter",
+    "whole milk",
+    "large eggs",
+    "kosher salt",
+    "black pepper",
+    "olive oil",
+    "garlic",
+    "yellow onion",
+    "chicken breast",
+    "ground beef",
+    "diced tomatoes",
+    "heavy cream",
+    "parmesan cheese",
+    "baking powder",
+    "vanilla extract",
+    "fresh parsley",
+    "lemon juice",
+]
+NOTES = ["", "", "", ", divided", ", finely chopped", ", melted", ", at room temperature", ", to taste"]
+
+CORPUS_SIZE = 200_000
+ROUNDS = 3
+
+
+def build_corpus(size: int, seed: int = 0) -> list[str]:
+    """Build ingredient lines with the heavy repetition of a real recipe library."""
+    rng = random.Random(seed)  # noqa: S311
+    weights = [1 / (rank + 1) for rank in range(len(NAMES))]
+    lines = []
+    for _ in range(size):
+        parts = [rng.choice(QUANTITIES), rng.choice(UNITS), rng.choices(NAMES, weights)[0]]
+        lines.append(" ".join(part for part in parts if part) + rng.choice(NOTES))
+    return lines
+
+
+def main() -> None:
+    """Report parse throughput with a cold and a warm cache."""
+    corpus = build_corpus(CORPUS_SIZE)
+    sys.stdout.write(f"Corpus: {len(corpus)} lines, {len(set(corpus))} distinct\n")
+
+    uncached = parse_ingredient.__wrapped__
+    start = time.perf_counter()
+    for line in corpus:
+        uncached(line)
+    elapsed = time.perf_counter() - start
+    sys.stdout.write(f"uncached: {len(corpus) / elapsed:>12,.0f} lines/s\n")
+
+    for round_number in range(1, ROUNDS + 1):
+        if round_number == 1:
+            parse_ingredient.cache_clear()
+        start = time.perf_counter()
+        parse_ingredients(corpus)
+        elapsed = time.perf_counter() - start
+        label = "cold cache" if round_number == 1 else "warm cache"
+        sys.stdout.write(f"{label}: {len(corpus) / elapsed:>10,.0f} lines/s\n")
+    sys.stdout.write(f"{parse_ingredient.cache_info()}\n")
+
+
+if __name__ == "__main__":
+    main()
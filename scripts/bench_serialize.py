@@ -0,0 +1,98 @@
+"""Script to benchmark recipe JSON serialization against the json.dumps path it replaced."""
+
+import json
+import logging
+import sys
+import time
+
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+from recipito.ingredients import parse_ingredients
+from recipito.logger import logger
+from recipito.serialize import NEXTCLOUD_DATE_FORMAT
+from recipito.serialize import dumps
+from recipito.serialize import loads
+from recipito.serialize import orjson
+from recipito.utils import build_nextcloud_recipe
+
+RECIPES = 2_000
+
+RAW_RECIPE = {
+    "id": "12345",
+    "name": "Crème Brûlée",
+    "sourceUrl": "https://example.com/recipes/creme-brulee",
+    "servings": 6,
+    "cookTime": 2700000000,
+    "prepTime": 900000000,
+    "totalTime": 3600000000,
+    "categories": ["Dessert"],
+    "cuisines": ["French"],
+    "imageUrls": [f"https://example.com/images/creme-brulee-{n}.jpg" for n in range(6)],
+    "keywords": ["custard", "baked", "make ahead"],
+    "ingredients": [{"name": f"{n % 4 + 1} ½ cups ingredient number {n}, at room temperature"} for n in range(15)],
+    "instructions": [
+        {"type": "step", "text": f"Step {n}: whisk everything together and bake for {n * 5} minutes."}
+        for n in range(10)
+    ],
+    "source": "fromUrl",
+}
+
+
+class DateTimeEncoder(json.JSONEncoder):
+    """The encoder recipe.json used to be written with."""
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, datetime):
+            return o.strftime(NEXTCLOUD_DATE_FORMAT)
+        return super().default(o)
+
+
+def legacy_save(raw_json: str) -> tuple[str, str]:
+    """Serialize one recipe the way save_nextcloud_recipe used to."""
+    recipe = build_nextcloud_recipe(json.loads(raw_json), "Dessert")
+    nextcloud_data = recipe.model_dump(by_alias=True)
+    ingredients = parse_ingredients(nextcloud_data["recipeIngredient"])
+    return (
+        json.dumps(nextcloud_data, indent=2, cls=DateTimeEncoder),
+        json.dumps([ingredient.model_dump() for ingredient in ingredients], indent=2),
+    )
+
+
+def current_save(raw_json: str) -> tuple[str, str]:
+    """Serialize one recipe the way save_nextcloud_recipe does now."""
+    recipe = build_nextcloud_recipe(loads(raw_json), "Dessert")
+    return recipe.model_dump_json(), dumps(parse_ingredients(recipe.recipeIngredient))
+
+
+def measure(label: str, func: Callable[[], object]) -> float:
+    """Run func once per recipe and report the recipes per second."""
+    start = time.perf_counter()
+    for _ in range(RECIPES):
+        func()
+    rate = RECIPES / (time.perf_counter() - start)
+    sys.stdout.write(f"{label:<28} {rate:>10,.0f} recipes/s\n")
+    return rate
+
+
+def main() -> None:
+    """Compare the raw JSON round trip and the recipe.json write of both paths."""
+    logger.setLevel(logging.WARNING)
+    raw_json = json.dumps(RAW_RECIPE, indent=2)
+    if legacy_save(raw_json) != current_save(raw_json):
+        sys.stdout.write("Output differs from the json.dumps path\n")
+        sys.exit(1)
+    sys.stdout.write(f"orjson: {'installed' if orjson is not None else 'not installed'}\n")
+
+    legacy = measure("json round trip", lambda: json.dumps(json.loads(raw_json), indent=2))
+    current = measure("serialize round trip", lambda: dumps(loads(raw_json)))
+    sys.stdout.write(f"{'speedup':<28} {current / legacy:>10.1f}x\n")
+
+    legacy = measure("json recipe files", lambda: legacy_save(raw_json))
+    current = measure("serialize recipe files", lambda: current_save(raw_json))
+    sys.stdout.write(f"{'speedup':<28} {current / legacy:>10.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
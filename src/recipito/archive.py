@@ -0,0 +1,137 @@
+"""Single-file archive output."""
+
+import io
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from pathlib import Path
+from typing import BinaryIO
+
+try:
+    import zstandard
+except ImportError:  # Optional, needed for tar.zst archives
+    zstandard = None
+
+from recipito.logger import logger
+
+# Archive formats and the file extension each is written with
+ARCHIVE_FORMATS = {"zip": ".zip", "tar": ".tar", "tar.zst": ".tar.zst"}
+DEFAULT_ARCHIVE_FORMAT = "zip"
+FILE_MODE = 0o644
+
+
+def check_archive_format(archive_format: str) -> None:
+    """Check that archives of the given format can be written.
+
+    Raises:
+        ValueError: If the format is unknown, or is tar.zst without zstandard installed.
+    """
+    if archive_format not in ARCHIVE_FORMATS:
+        msg = f"Archive format must be one of {', '.join(ARCHIVE_FORMATS)}, got {archive_format!r}"
+        raise ValueError(msg)
+    if archive_format == "tar.zst" and zstandard is None:
+        msg = "tar.zst archives need the zstandard package"
+        raise ValueError(msg)
+
+
+class RecipeArchive:
+    """Writes recipes into one archive in the Nextcloud Cookbook folder layout.
+
+    Each recipe becomes a ``<title>/recipe.json`` entry with an optional
+    ``<title>/full.jpg``, so the archive can be unpacked straight into a
+    Cookbook folder. Entries are streamed to disk as recipes are added and
+    images are copied in chunks, so memory use does not grow with the size
+    of the recipes. Only the archived titles are remembered, and a zip also
+    keeps a small directory record per entry until it is closed. A tar is
+    readable up to its last complete recipe if the import is interrupted.
+
+    Images waiting to be archived are kept in the temporary ``image_dir``,
+    which is removed when the archive is closed, so an archive import leaves
+    no per-image files behind.
+    """
+
+    def __init__(self, path: Path, archive_format: str = DEFAULT_ARCHIVE_FORMAT) -> None:
+        """Create the archive at path.
+
+        Raises:
+            ValueError: If archives of this format cannot be written.
+        """
+        check_archive_format(archive_format)
+        self.path = path
+        self.archive_format = archive_format
+        self.recipes = 0
+        self.titles: set[str] = set()
+        self._images = tempfile.TemporaryDirectory(prefix="recipito-images-", ignore_cleanup_errors=True)
+        self.image_dir = Path(self._images.name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = path.open("wb")
+        self._zip: zipfile.ZipFile | None = None
+        self._tar: tarfile.TarFile | None = None
+        self._compressor: BinaryIO | None = None
+        if archive_format == "zip":
+            self._zip = zipfile.ZipFile(self._file, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            stream: BinaryIO = self._file
+            if archive_format == "tar.zst":
+                self._compressor = zstandard.ZstdCompressor().stream_writer(self._file, closefd=False)
+                stream = self._compressor
+            self._tar = tarfile.open(fileobj=stream, mode="w|", format=tarfile.PAX_FORMAT)  # noqa: SIM115
+
+    def _add_bytes(self, name: str, data: bytes) -> None:
+        if self._zip is not None:
+            info = zipfile.ZipInfo(name, time.localtime()[:6])
+            info.external_attr = FILE_MODE << 16
+            self._zip.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
+        elif self._tar is not None:
+            info = tarfile.TarInfo(name)
+            info.size, info.mtime, info.mode = len(data), int(time.time()), FILE_MODE
+            self._tar.addfile(info, io.BytesIO(data))
+
+    def _add_file(self, name: str, source: Path) -> None:
+        if self._zip is not None:
+            # JPEGs are already compressed, so they are stored as they are
+            self._zip.write(source, name, compress_type=zipfile.ZIP_STORED)
+        elif self._tar is not None:
+            info = tarfile.TarInfo(name)
+            info.size, info.mtime, info.mode = source.stat().st_size, int(time.time()), FILE_MODE
+            with source.open("rb") as f:
+                self._tar.addfile(info, f)
+
+    def add_recipe(self, title: str, recipe_json: str, image: Path | None = None) -> str:
+        """Append a recipe directory with its recipe.json and optional full.jpg.
+
+        A title already used in the archive gets the first free ``"title (n)"``
+        name, as when merging, so unpacking never mixes two recipes' files.
+
+        Returns:
+            The directory name the recipe was archived under.
+        """
+        final_title, suffix = title, 1
+        while final_title in self.titles:
+            suffix += 1
+            final_title = f"{title} ({suffix})"
+        if final_title != title:
+            logger.warning("[yellow]Title collision, archiving[/] %s [yellow]as[/] %s", title, final_title)
+        self.titles.add(final_title)
+
+        self._add_bytes(f"{final_title}/recipe.json", recipe_json.encode())
+        if image is not None:
+            self._add_file(f"{final_title}/full.jpg", image)
+        self.recipes += 1
+        return final_title
+
+    def close(self) -> None:
+        """Finish the archive, close its file and remove the temporary image directory."""
+        self._images.cleanup()
+        if self._file.closed:
+            return
+        if self._zip is not None:
+            self._zip.close()
+        if self._tar is not None:
+            self._tar.close()
+        if self._compressor is not None:
+            self._compressor.close()
+        self._file.close()
+        logger.info("[blue]Archived[/] %d [blue]recipes to[/] %s", self.recipes, self.path)
@@ -0,0 +1,199 @@
+"""Sitemap and category page crawling."""
+
+import gzip
+import hashlib
+import math
+import re
+import urllib.parse
+
+from collections import deque
+from collections.abc import Iterable
+from collections.abc import Iterator
+from html.parser import HTMLParser
+from typing import IO
+from xml.etree.ElementTree import iterparse
+
+import requests
+
+from recipito.dedupe import canonicalize_url
+from recipito.logger import logger
+
+DEFAULT_MAX_PAGES = 1000
+DEFAULT_MAX_FRONTIER = 10_000
+DEFAULT_SEEN_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 0.001
+CRAWL_TIMEOUT = 30
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set used to remember URLs already discovered.
+
+    Membership tests can give false positives at roughly ``error_rate`` once
+    ``capacity`` items have been added, but never false negatives.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_SEEN_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE) -> None:
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(-(-self.size // 8))
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """Add an item and return True if it was not already present."""
+        added = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                added = True
+        return added
+
+
+class _LinkParser(HTMLParser):
+    """Incremental HTML parser collecting link targets as they are seen."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.links: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+
+def _is_sitemap(url: str, response: requests.Response) -> bool:
+    path = urllib.parse.urlsplit(url).path.lower()
+    return path.endswith((".xml", ".xml.gz")) or "xml" in response.headers.get("Content-Type", "")
+
+
+def iter_sitemap(stream: IO[bytes]) -> Iterator[tuple[bool, str]]:
+    """Stream ``<loc>`` entries from a sitemap or sitemap index.
+
+    Yields:
+        ``(is_sitemap, url)`` pairs, where is_sitemap is True for entries of a
+        sitemap index that point to further sitemaps.
+    """
+    is_index = False
+    # The standard library parser does not expand external entities
+    for event, element in iterparse(stream, events=("start", "end")):  # noqa: S314
+        tag = element.tag.rsplit("}", 1)[-1]
+        if event == "start":
+            if tag == "sitemapindex":
+                is_index = True
+            continue
+        if tag == "loc" and element.text:
+            yield is_index, element.text.strip()
+        elif tag in ("url", "sitemap"):
+            # Drop finished entries so memory stays flat on large sitemaps
+            element.clear()
+
+
+def iter_page_links(chunks: Iterable[str], base_url: str) -> Iterator[str]:
+    """Stream absolute link targets from HTML delivered in chunks."""
+    parser = _LinkParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        for href in parser.links:
+            yield urllib.parse.urljoin(base_url, href)
+        parser.links.clear()
+    parser.close()
+    for href in parser.links:
+        yield urllib.parse.urljoin(base_url, href)
+
+
+class Crawler:
+    """Discovers recipe URLs from sitemaps and category listing pages.
+
+    Pages are parsed incrementally and their recipe URLs are yielded one at a
+    time, so the next page is only fetched once the consumer has imported the
+    current page's recipes. Pages still to visit are kept in a bounded
+    frontier, and discovered URLs are deduplicated with a Bloom filter.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        start_urls: Iterable[str],
+        *,
+        match: str | None = None,
+        follow: str | None = None,
+        max_pages: int = DEFAULT_MAX_PAGES,
+        max_frontier: int = DEFAULT_MAX_FRONTIER,
+        seen: BloomFilter | None = None,
+    ) -> None:
+        self.match = re.compile(match) if match else None
+        self.follow = re.compile(follow) if follow else None
+        self.max_pages = max_pages
+        self.max_frontier = max_frontier
+        self.seen = seen if seen is not None else BloomFilter()
+        self.frontier: deque[str] = deque()
+        self.pages_visited = 0
+        for url in start_urls:
+            self._enqueue(url)
+
+    def _enqueue(self, url: str) -> None:
+        if len(self.frontier) >= self.max_frontier:
+            logger.warning("[yellow]Crawl frontier full, dropping page:[/] %s", url)
+            return
+        if self.seen.add("page:" + canonicalize_url(url)):
+            self.frontier.append(url)
+
+    def _accept_recipe(self, url: str) -> bool:
+        if self.match is not None and not self.match.search(url):
+            return False
+        return self.seen.add("recipe:" + canonicalize_url(url))
+
+    def _crawl_sitemap(self, url: str, response: requests.Response) -> Iterator[str]:
+        response.raw.decode_content = True
+        stream: IO[bytes] = response.raw
+        if urllib.parse.urlsplit(url).path.lower().endswith(".gz"):
+            stream = gzip.GzipFile(fileobj=response.raw)  # type: ignore[assignment]
+        for is_sitemap, loc in iter_sitemap(stream):
+            if is_sitemap:
+                self._enqueue(loc)
+            elif self._accept_recipe(loc):
+                yield loc
+
+    def _crawl_listing(self, url: str, response: requests.Response) -> Iterator[str]:
+        host = urllib.parse.urlsplit(url).netloc
+        response.encoding = response.encoding or "utf-8"
+        for link in iter_page_links(response.iter_content(chunk_size=16384, decode_unicode=True), url):
+            link = urllib.parse.urldefrag(link).url  # noqa: PLW2901
+            if urllib.parse.urlsplit(link).netloc != host:
+                continue
+            if self.follow is not None and self.follow.search(link):
+                self._enqueue(link)
+            elif self._accept_recipe(link):
+                yield link
+
+    def __iter__(self) -> Iterator[str]:
+        while self.frontier and self.pages_visited < self.max_pages:
+            url = self.frontier.popleft()
+            self.pages_visited += 1
+            logger.info("[blue]Crawling:[/] %s", url)
+            try:
+                # Read the whole page before handing out its URLs so the connection
+                # is not held open while recipes are being imported
+                with requests.get(url, stream=True, timeout=CRAWL_TIMEOUT) as response:
+                    response.raise_for_status()
+                    if _is_sitemap(url, response):
+                        found = list(self._crawl_sitemap(url, response))
+                    else:
+                        found = list(self._crawl_listing(url, response))
+            except Exception as e:
+                logger.error("[red]Error crawling[/] %s: %s", url, e)
+                continue
+            logger.info("[blue]Found[/] %d [blue]new recipe URLs on[/] %s", len(found), url)
+            yield from found
+
+        if self.frontier:
+            logger.warning("[yellow]Crawl stopped at the page limit,[/] %d [yellow]pages left[/]", len(self.frontier))
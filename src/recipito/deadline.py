@@ -0,0 +1,132 @@
+"""Per-URL time budgets."""
+
+import time
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import requests
+
+from urllib3.exceptions import ReadTimeoutError
+
+# Total seconds a single URL may take, and the share each stage may use of it
+DEFAULT_DEADLINE = 120.0
+DEFAULT_STAGE_BUDGETS: dict[str, float] = {
+    "title": 20.0,
+    "extract": 60.0,
+    "image": 30.0,
+    "write": 10.0,
+}
+READ_CHUNK_SIZE = 16384
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a URL runs out of its total or per-stage time budget."""
+
+    def __init__(self, stage: str) -> None:
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+def _is_timeout(error: BaseException) -> bool:
+    """Return whether a connection error was caused by a read or socket timeout."""
+    causes = [error, error.__cause__, error.__context__, *error.args]
+    return any(isinstance(cause, (ReadTimeoutError, TimeoutError)) for cause in causes)
+
+
+class Deadline:
+    """Time budget for processing one URL.
+
+    Stages are started one after another; each may run until its own budget
+    or the overall deadline runs out, whichever comes first. Work checks the
+    deadline cooperatively, so an expired stage is abandoned at its next
+    check rather than interrupted.
+    """
+
+    def __init__(self, total: float | None = None, stage_budgets: dict[str, float] | None = None) -> None:
+        self.started = time.monotonic()
+        self.end = None if total is None else self.started + total
+        self.stage_budgets = stage_budgets or {}
+        self.stage_name = ""
+        self.stage_end: float | None = self.end
+
+    def remaining(self) -> float | None:
+        """Return the seconds left in the current stage, or None if it is unbounded."""
+        if self.stage_end is None:
+            return None
+        return self.stage_end - time.monotonic()
+
+    def start(self, stage: str) -> float | None:
+        """Start a stage and return the seconds it may take, or None if it is unbounded.
+
+        Raises:
+            DeadlineExceededError: If no time is left for the stage.
+        """
+        now = time.monotonic()
+        budget = self.stage_budgets.get(stage)
+        ends = [end for end in (self.end, None if budget is None else now + budget) if end is not None]
+        self.stage_name = stage
+        self.stage_end = min(ends) if ends else None
+        self.check()
+        return self.remaining()
+
+    def limit(self, seconds: float) -> None:
+        """End the current stage within seconds from now, unless it already ends sooner.
+
+        Another thread can use this to bound work that checks the deadline, or
+        to abandon it with a limit of 0.
+        """
+        end = time.monotonic() + seconds
+        if self.stage_end is None or end < self.stage_end:
+            self.stage_end = end
+
+    def check(self) -> None:
+        """Raise DeadlineExceededError if the current stage is out of time."""
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError(self.stage_name)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[float | None]:
+        """Run a network stage, yielding the timeout to pass to requests.
+
+        Request timeouts inside the stage are reported as DeadlineExceededError,
+        including a body that stalls after the headers, which surfaces as a
+        urllib3 read timeout or a connection error wrapping one.
+        """
+        timeout = self.start(stage)
+        with self.timeouts():
+            yield timeout
+
+    @contextmanager
+    def timeouts(self) -> Iterator[None]:
+        """Report request timeouts inside the block as DeadlineExceededError for the current stage."""
+        try:
+            yield
+        except (requests.Timeout, ReadTimeoutError) as e:
+            raise DeadlineExceededError(self.stage_name) from e
+        except requests.ConnectionError as e:
+            if not _is_timeout(e):
+                raise
+            raise DeadlineExceededError(self.stage_name) from e
+
+    def read(self, response: requests.Response) -> bytes:
+        """Read a streamed response body, checking the deadline as data arrives.
+
+        Data is read as soon as it is received rather than in fixed-size
+        blocks, so a server trickling bytes cannot hold a read open past the
+        deadline. The body is stored on the response, so ``response.text``
+        and ``response.json()`` work as usual afterwards.
+        """
+        chunks = []
+        try:
+            while chunk := response.raw.read1(READ_CHUNK_SIZE, decode_content=True):
+                chunks.append(chunk)
+                self.check()
+        except DeadlineExceededError:
+            # Drop the connection instead of draining the rest of a slow body
+            response.close()
+            raise
+        body = b"".join(chunks)
+        response._content = body  # noqa: SLF001 - requests has no public setter for a pre-read body
+        return body
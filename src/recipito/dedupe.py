@@ -0,0 +1,233 @@
+"""Near-duplicate recipe detection."""
+
+import hashlib
+import random
+import re
+import urllib.parse
+
+from pathlib import Path
+from typing import Any
+
+from recipito.logger import logger
+from recipito.serialize import dumps
+from recipito.serialize import loads
+
+# MinHash/LSH parameters: 16 bands of 4 rows put the LSH candidate threshold
+# around 0.5, well below the similarity we actually report as a duplicate.
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+SIMILARITY_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1)  # noqa: S311 - fixed seed keeps signatures stable across runs
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)
+]
+
+# Query parameters that never change the recipe a URL points to
+TRACKING_PARAMS = frozenset({"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "amp", "print", "output"})
+TRACKING_PREFIXES = ("utm_",)
+# Path segments used for alternate views of the same page (AMP, print)
+VIEW_SEGMENTS = frozenset({"amp", "print"})
+
+# Signatures cached by from_directory are only reused while fingerprinting is unchanged
+_CACHE_FORMAT = {"version": 1, "permutations": NUM_PERMUTATIONS, "shingleSize": SHINGLE_SIZE}
+
+_NON_WORD = re.compile(r"[^a-z0-9/ ]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a recipe URL so that variants of the same page compare equal.
+
+    Args:
+        url: The URL as given by the user.
+
+    Returns:
+        The URL with a lowercase scheme and host, no ``www.`` prefix, no
+        fragment, no tracking parameters and no AMP/print view segments.
+
+    Example:
+        >>> canonicalize_url("HTTPS://www.Example.com/pie/amp/?utm_source=x#top")
+        "https://example.com/pie"
+    """
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = parts.netloc.lower().removeprefix("www.")
+
+    segments = [segment for segment in parts.path.split("/") if segment]
+    while segments and segments[-1].lower() in VIEW_SEGMENTS:
+        segments.pop()
+    path = "/" + "/".join(segments) if segments else ""
+
+    query = sorted(
+        (key, value)
+        for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urllib.parse.urlunsplit((scheme, host, path, urllib.parse.urlencode(query), ""))
+
+
+def url_key(url: str) -> str:
+    """Key a URL by its canonical form without the scheme, so http and https variants match."""
+    return canonicalize_url(url).split("://", 1)[-1]
+
+
+def _normalize_line(line: str) -> str:
+    """Lowercase a line and strip punctuation so formatting differences are ignored."""
+    return _WHITESPACE.sub(" ", _NON_WORD.sub(" ", line.lower())).strip()
+
+
+def recipe_shingles(recipe: dict[str, Any]) -> set[str]:
+    """Build the shingle set used to fingerprint a Nextcloud recipe.
+
+    Ingredient lines are used whole, instructions contribute word shingles of
+    ``SHINGLE_SIZE`` words so that small rewordings still overlap.
+    """
+    shingles = {f"i:{line}" for line in map(_normalize_line, recipe.get("recipeIngredient", [])) if line}
+    for instruction in recipe.get("recipeInstructions", []):
+        words = _normalize_line(instruction).split()
+        if len(words) < SHINGLE_SIZE:
+            if words:
+                shingles.add("s:" + " ".join(words))
+            continue
+        shingles.update("s:" + " ".join(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+    return shingles
+
+
+def minhash_signature(shingles: set[str]) -> tuple[int, ...]:
+    """Compute the MinHash signature of a shingle set."""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles]
+    return tuple(min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def fingerprint_recipe(recipe: dict[str, Any]) -> tuple[int, ...] | None:
+    """Return the MinHash signature of a Nextcloud recipe, or None if it has no content."""
+    shingles = recipe_shingles(recipe)
+    if not shingles:
+        return None
+    return minhash_signature(shingles)
+
+
+def _encode_signature(signature: tuple[int, ...] | None) -> str | None:
+    return None if signature is None else "".join(f"{value:08x}" for value in signature)
+
+
+def _decode_signature(text: str | None) -> tuple[int, ...] | None:
+    return None if text is None else tuple(int(text[i : i + 8], 16) for i in range(0, len(text), 8))
+
+
+def _read_cache(path: Path | None) -> dict[str, dict[str, Any]]:
+    """Return the cached entries of a signature cache, or none if it is missing, unreadable or stale."""
+    if path is None or not path.exists():
+        return {}
+    try:
+        cache = loads(path.read_bytes())
+    except (OSError, ValueError) as e:
+        logger.warning("[yellow]Ignoring unreadable recipe index cache[/] %s: %s", path, e)
+        return {}
+    if not isinstance(cache, dict) or cache.get("format") != _CACHE_FORMAT:
+        return {}
+    return cache.get("recipes", {})
+
+
+def _write_cache(path: Path, entries: dict[str, dict[str, Any]]) -> None:
+    """Write a signature cache, replacing the old one only once the new one is complete."""
+    partial = path.with_name(f"{path.name}.partial")
+    try:
+        partial.write_text(dumps({"format": _CACHE_FORMAT, "recipes": entries}))
+        partial.replace(path)
+    except OSError as e:
+        logger.warning("[yellow]Could not write recipe index cache[/] %s: %s", path, e)
+
+
+def estimate_similarity(first: tuple[int, ...], second: tuple[int, ...]) -> float:
+    """Estimate the Jaccard similarity of two MinHash signatures."""
+    return sum(a == b for a, b in zip(first, second, strict=True)) / len(first)
+
+
+class RecipeIndex:
+    """LSH index over recipe fingerprints and canonical source URLs."""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD) -> None:
+        self.threshold = threshold
+        self.urls: dict[str, str] = {}
+        self.signatures: dict[str, tuple[int, ...]] = {}
+        self._rows = NUM_PERMUTATIONS // LSH_BANDS
+        self._buckets: list[dict[tuple[int, ...], list[str]]] = [{} for _ in range(LSH_BANDS)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _bands(self, signature: tuple[int, ...]) -> list[tuple[int, ...]]:
+        return [signature[band * self._rows : (band + 1) * self._rows] for band in range(LSH_BANDS)]
+
+    def add(self, name: str, url: str, signature: tuple[int, ...] | None) -> None:
+        """Register a recipe under its name, source URL and fingerprint."""
+        if url:
+            self.urls[url_key(url)] = name
+        if signature is None:
+            return
+        self.signatures[name] = signature
+        for buckets, band in zip(self._buckets, self._bands(signature), strict=True):
+            buckets.setdefault(band, []).append(name)
+
+    def find_url(self, url: str) -> str | None:
+        """Return the name of a recipe already imported from the same canonical URL."""
+        return self.urls.get(url_key(url))
+
+    def find_duplicate(self, signature: tuple[int, ...] | None) -> str | None:
+        """Return the name of the most similar indexed recipe above the threshold, if any."""
+        if signature is None:
+            return None
+        candidates: set[str] = set()
+        for buckets, band in zip(self._buckets, self._bands(signature), strict=True):
+            candidates.update(buckets.get(band, ()))
+
+        best_name, best_score = None, self.threshold
+        for name in candidates:
+            score = estimate_similarity(signature, self.signatures[name])
+            if score >= best_score:
+                best_name, best_score = name, score
+        return best_name
+
+    @classmethod
+    def from_directory(
+        cls, recipes_dir: Path, threshold: float = SIMILARITY_THRESHOLD, cache_path: Path | None = None
+    ) -> "RecipeIndex":
+        """Build an index from an existing Nextcloud recipes directory.
+
+        With a cache_path, the URL and fingerprint of each recipe are kept
+        there, keyed by its directory and the size and modification time of
+        its recipe.json. Only recipes that are new or changed since the last
+        run are read and fingerprinted again.
+        """
+        index = cls(threshold)
+        if not recipes_dir.is_dir():
+            return index
+        cached = _read_cache(cache_path)
+        entries: dict[str, dict[str, Any]] = {}
+        for recipe_path in sorted(recipes_dir.glob("*/recipe.json")):
+            name = recipe_path.parent.name
+            try:
+                stat = recipe_path.stat()
+                entry = cached.get(name)
+                if entry is None or (entry.get("mtime"), entry.get("size")) != (stat.st_mtime_ns, stat.st_size):
+                    recipe = loads(recipe_path.read_bytes())
+                    entry = {
+                        "mtime": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                        "url": recipe.get("url", ""),
+                        "signature": _encode_signature(fingerprint_recipe(recipe)),
+                    }
+            except (OSError, ValueError) as e:
+                logger.warning("[yellow]Skipping unreadable recipe[/] %s: %s", recipe_path, e)
+                continue
+            entries[name] = entry
+            index.add(name, entry["url"], _decode_signature(entry["signature"]))
+        if cache_path is not None and entries != cached:
+            _write_cache(cache_path, entries)
+        logger.info("[blue]Indexed[/] %d [blue]existing recipes for duplicate detection[/]", len(index))
+        return index
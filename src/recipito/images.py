@@ -0,0 +1,364 @@
+"""Content-addressed recipe image store."""
+
+import io
+import math
+import os
+import re
+import shutil
+import threading
+
+from collections.abc import Sequence
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from PIL import Image
+from PIL import ImageFile
+
+from recipito.deadline import Deadline
+from recipito.deadline import DeadlineExceededError
+from recipito.logger import logger
+from recipito.models import ImageCandidate
+from recipito.profiling import profiler
+
+# dHash grid is HASH_SIZE x HASH_SIZE bits; images within MAX_DISTANCE bits are the same picture
+HASH_SIZE = 8
+MAX_DISTANCE = 4
+# The 64-bit hash is split into MAX_DISTANCE + 1 bands: by pigeonhole, any hash within
+# MAX_DISTANCE bits of another matches it exactly on at least one band.
+_BANDS = MAX_DISTANCE + 1
+_BAND_BITS = -(-HASH_SIZE * HASH_SIZE // _BANDS)
+
+JPEG_QUALITY = 85
+# A larger copy only replaces a stored image when their aspect ratios differ by at most this fraction,
+# since the hash ignores aspect ratio and a different crop of the same picture would change every linked recipe
+ASPECT_TOLERANCE = 0.02
+
+# Smallest width an image needs for the recipe page; the smallest download meeting it wins
+DEFAULT_TARGET_WIDTH = 1024
+# Image headers (and so dimensions) almost always fit in the first bytes of the file
+PROBE_BYTES = 64 * 1024
+PROBE_WORKERS = 8
+PROBE_TIMEOUT = 10
+DOWNLOAD_TIMEOUT = 30
+
+_CONTENT_RANGE_TOTAL = re.compile(r"/(\d+)$")
+
+
+def dhash(image: Image.Image) -> int:
+    """Compute the difference hash of an image.
+
+    The image is reduced to a small grayscale grid and each bit records whether
+    a pixel is brighter than its right-hand neighbour, which survives rescaling
+    and recompression.
+
+    Args:
+        image: The image to hash.
+
+    Returns:
+        The hash as a ``HASH_SIZE * HASH_SIZE`` bit integer.
+    """
+    pixels = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR).tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            offset = row * (HASH_SIZE + 1) + col
+            value = (value << 1) | (pixels[offset] > pixels[offset + 1])
+    return value
+
+
+def request_timeout(deadline: Deadline | None, limit: float) -> float:
+    """Return the timeout for a request: limit, or less if the deadline ends sooner.
+
+    Raises:
+        DeadlineExceededError: If the deadline has already run out.
+    """
+    if deadline is None:
+        return limit
+    deadline.check()
+    remaining = deadline.remaining()
+    return limit if remaining is None else min(limit, remaining)
+
+
+def probe_image(url: str, deadline: Deadline | None = None) -> ImageCandidate:
+    """Read the size and dimensions of an image from a ranged request for its first bytes.
+
+    Servers that ignore the Range header are read only up to PROBE_BYTES.
+
+    Raises:
+        DeadlineExceededError: If the deadline runs out while probing.
+    """
+    headers = {"Range": f"bytes=0-{PROBE_BYTES - 1}"}
+    timeout = request_timeout(deadline, PROBE_TIMEOUT)
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        content_length = None
+        total = _CONTENT_RANGE_TOTAL.search(response.headers.get("Content-Range", ""))
+        if total is not None:
+            content_length = int(total.group(1))
+        elif response.status_code != requests.codes.partial_content and response.headers.get("Content-Length"):
+            content_length = int(response.headers["Content-Length"])
+
+        parser = ImageFile.Parser()
+        received = 0
+        for chunk in response.iter_content(chunk_size=8192):
+            parser.feed(chunk)
+            received += len(chunk)
+            if parser.image is not None or received >= PROBE_BYTES:
+                break
+            if deadline is not None:
+                deadline.check()
+
+    width, height = parser.image.size if parser.image is not None else (None, None)
+    return ImageCandidate(url=url, width=width, height=height, contentLength=content_length)
+
+
+def choose_image(candidates: Sequence[ImageCandidate], target_width: int) -> ImageCandidate | None:
+    """Pick the cheapest candidate that is at least target_width wide.
+
+    When no candidate is wide enough the largest one is used instead.
+    """
+    sized = [candidate for candidate in candidates if candidate.pixels]
+    wide_enough = [candidate for candidate in sized if (candidate.width or 0) >= target_width]
+    if wide_enough:
+        return min(wide_enough, key=lambda c: (c.contentLength or math.inf, c.pixels))
+    if sized:
+        return max(sized, key=lambda c: c.pixels)
+    return None
+
+
+def _bands(value: int) -> list[int]:
+    mask = (1 << _BAND_BITS) - 1
+    return [(value >> (band * _BAND_BITS)) & mask for band in range(_BANDS)]
+
+
+def link_file(source: Path, destination: Path) -> None:
+    """Hardlink source to destination, falling back to a copy across filesystems."""
+    destination.unlink(missing_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+class ImageStore:
+    """Stores each distinct image once, keyed by its perceptual hash.
+
+    Images live in ``root`` as ``<dhash>.jpg``. Source URLs that have already
+    been downloaded are recorded in ``root / "urls.tsv"`` so they are never
+    fetched again.
+    """
+
+    def __init__(self, root: Path, target_width: int = DEFAULT_TARGET_WIDTH) -> None:
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.target_width = target_width
+        self._lock = threading.Lock()
+        self._probe_executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="image-probe")
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-prefetch")
+        # Started downloads, each with the deadline its worker checks so it can be bounded or abandoned
+        self._pending: dict[tuple[str, ...], tuple[Future[str], Deadline]] = {}
+        self._urls_path = root / "urls.tsv"
+        self.urls: dict[str, str] = {}
+        self._hashes: set[int] = set()
+        self._buckets: list[dict[int, list[int]]] = [{} for _ in range(_BANDS)]
+
+        for image_path in root.glob("*.jpg"):
+            try:
+                self._index(int(image_path.stem, 16))
+            except ValueError:
+                continue
+        if self._urls_path.exists():
+            for line in self._urls_path.read_text().splitlines():
+                key, _, url = line.partition("\t")
+                if url and (root / f"{key}.jpg").exists():
+                    self.urls[url] = key
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _index(self, value: int) -> None:
+        self._hashes.add(value)
+        for buckets, band in zip(self._buckets, _bands(value), strict=True):
+            buckets.setdefault(band, []).append(value)
+
+    def _remember(self, url: str, key: str) -> None:
+        self.urls[url] = key
+        with self._urls_path.open("a") as f:
+            f.write(f"{key}\t{url}\n")
+
+    def path(self, key: str) -> Path:
+        """Return the stored file for an image key."""
+        return self.root / f"{key}.jpg"
+
+    def find_similar(self, value: int) -> int | None:
+        """Return a stored hash within MAX_DISTANCE bits of value, if any."""
+        for buckets, band in zip(self._buckets, _bands(value), strict=True):
+            for candidate in buckets.get(band, ()):
+                if (candidate ^ value).bit_count() <= MAX_DISTANCE:
+                    return candidate
+        return None
+
+    def _save(self, data: bytes, key: str) -> None:
+        encoded = io.BytesIO()
+        with Image.open(io.BytesIO(data)) as image:
+            # Convert to RGB if necessary (e.g., for PNG with transparency)
+            rgb = image.convert("RGB") if image.mode in ("RGBA", "P") else image
+            rgb.save(encoded, "JPEG", quality=JPEG_QUALITY)
+        # Encoding first means a bad image cannot truncate the stored file, and writing
+        # through the existing file keeps hardlinks to it pointing at the new data
+        with self.path(key).open("wb") as f:
+            f.write(encoded.getbuffer())
+
+    def _stored_size(self, key: str) -> tuple[int, int] | None:
+        try:
+            with Image.open(self.path(key)) as stored:
+                return stored.size
+        except OSError:
+            return None
+
+    def _is_upgrade(self, key: str, size: tuple[int, int]) -> bool:
+        """Return whether an image of size is a larger copy of the same framing as the stored one."""
+        stored = self._stored_size(key)
+        if stored is None:
+            return True
+        (width, height), (stored_width, stored_height) = size, stored
+        if width * height <= stored_width * stored_height:
+            return False
+        return abs(width * stored_height - stored_width * height) <= ASPECT_TOLERANCE * width * stored_height
+
+    def add(self, data: bytes, url: str = "") -> str:
+        """Store image bytes unless a perceptually identical image is already stored.
+
+        A stored image is replaced in place when the same picture arrives with
+        more pixels and the same aspect ratio, so a thumbnail seen first does
+        not stand in for every later, larger copy.
+
+        Returns:
+            The key of the stored image.
+        """
+        with Image.open(io.BytesIO(data)) as preview:
+            size = preview.size
+            # Let JPEG decoding downscale while loading, the hash only needs a thumbnail
+            preview.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+            value = dhash(preview)
+
+        with self._lock:
+            existing = self.find_similar(value)
+            if existing is None:
+                key = f"{value:016x}"
+                self._save(data, key)
+                self._index(value)
+                logger.info("[green]Stored new image[/] %s", key)
+            else:
+                key = f"{existing:016x}"
+                if self._is_upgrade(key, size):
+                    self._save(data, key)
+                    logger.info("[green]Replaced stored image[/] %s [green]with a larger copy[/]", key)
+                else:
+                    logger.info("[blue]Reusing stored image[/] %s", key)
+
+            if url:
+                self._remember(url, key)
+        return key
+
+    def fetch(self, url: str, deadline: Deadline | None = None) -> str:
+        """Return the key for an image URL, downloading it only if the URL is new.
+
+        Raises:
+            DeadlineExceededError: If the deadline runs out while downloading.
+        """
+        if url in self.urls:
+            logger.info("[blue]Image already stored for:[/] %s", url)
+            return self.urls[url]
+        logger.info("[blue]Downloading image from:[/] %s", url)
+        deadline = deadline or Deadline()
+        with requests.get(url, stream=True, timeout=request_timeout(deadline, DOWNLOAD_TIMEOUT)) as response:
+            response.raise_for_status()
+            data = deadline.read(response)
+        return self.add(data, url)
+
+    def select(self, urls: Sequence[str], deadline: Deadline | None = None) -> str:
+        """Probe candidate image URLs concurrently and return the one to download."""
+        if len(urls) == 1:
+            return urls[0]
+        candidates = []
+        probes = self._probe_executor.map(profiler.task(self._try_probe), urls, [deadline] * len(urls))
+        for url, probe in zip(urls, probes, strict=True):
+            if probe is not None:
+                logger.debug("Image candidate %s: %sx%s, %s bytes", url, probe.width, probe.height, probe.contentLength)
+                candidates.append(probe)
+        best = choose_image(candidates, self.target_width)
+        return urls[0] if best is None else best.url
+
+    @staticmethod
+    def _try_probe(url: str, deadline: Deadline | None) -> ImageCandidate | None:
+        try:
+            return probe_image(url, deadline)
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            logger.warning("[yellow]Failed to probe image[/] %s: %s", url, e)
+            return None
+
+    def fetch_best(self, urls: Sequence[str], timeout: float | None = None) -> str:
+        """Return the key of the best image among urls, reusing a prefetch if one was started.
+
+        The download itself is bounded by timeout too, so a slow image stops
+        instead of holding a worker after the recipe has moved on.
+
+        Raises:
+            DeadlineExceededError: If the image is not ready within timeout seconds.
+        """
+        future, job = self._pending.pop(tuple(urls), None) or self._submit(urls)
+        if timeout is not None:
+            job.limit(timeout)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError as e:
+            self._abandon(future, job)
+            raise DeadlineExceededError(stage="image") from e
+
+    def _submit(self, urls: Sequence[str]) -> tuple[Future[str], Deadline]:
+        job = Deadline()
+        job.start("image")
+        return self._prefetch_executor.submit(profiler.task(self._fetch_best), urls, job), job
+
+    @staticmethod
+    def _abandon(future: Future[str], job: Deadline) -> None:
+        # A queued download never starts; a running one stops at its next deadline check
+        future.cancel()
+        job.limit(0)
+
+    def _fetch_best(self, urls: Sequence[str], job: Deadline) -> str:
+        with job.timeouts():
+            known = next((url for url in urls if url in self.urls), None)
+            if known is not None:
+                return self.fetch(known, job)
+            return self.fetch(self.select(urls, job), job)
+
+    def prefetch(self, urls: Sequence[str]) -> None:
+        """Start choosing and downloading the image for urls in the background."""
+        key = tuple(urls)
+        if key and key not in self._pending:
+            self._pending[key] = self._submit(urls)
+
+    def discard(self, urls: Sequence[str]) -> None:
+        """Abandon the prefetch for urls if nothing asked for it, such as when its recipe was skipped."""
+        pending = self._pending.pop(tuple(urls), None)
+        if pending is not None:
+            self._abandon(*pending)
+
+    def close(self) -> None:
+        """Stop the worker threads without waiting, abandoning prefetches nothing asked for."""
+        for future, job in self._pending.values():
+            self._abandon(future, job)
+        self._pending.clear()
+        self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+        self._probe_executor.shutdown(wait=False, cancel_futures=True)
+
+    def link(self, key: str, destination: Path) -> None:
+        """Place a stored image at destination without duplicating its data."""
+        link_file(self.path(key), destination)
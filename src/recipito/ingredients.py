@@ -0,0 +1,156 @@
+"""Ingredient line parsing."""
+
+import re
+
+from collections.abc import Iterable
+from fractions import Fraction
+from functools import lru_cache
+
+from recipito.models import ParsedIngredient
+from recipito.text import convert_characters
+
+# Unit aliases mapped to their canonical name. Multi-letter lowercase aliases match
+# any case; single letters are matched exactly so that T (tablespoon) and t (teaspoon) differ.
+UNITS: dict[str, str] = {
+    "cup": "cup",
+    "cups": "cup",
+    "c": "cup",
+    "tablespoon": "tablespoon",
+    "tablespoons": "tablespoon",
+    "tbsp": "tablespoon",
+    "tbsps": "tablespoon",
+    "tbs": "tablespoon",
+    "tbl": "tablespoon",
+    "T": "tablespoon",
+    "teaspoon": "teaspoon",
+    "teaspoons": "teaspoon",
+    "tsp": "teaspoon",
+    "tsps": "teaspoon",
+    "t": "teaspoon",
+    "fluid ounce": "fluid ounce",
+    "fluid ounces": "fluid ounce",
+    "fl oz": "fluid ounce",
+    "ounce": "ounce",
+    "ounces": "ounce",
+    "oz": "ounce",
+    "pound": "pound",
+    "pounds": "pound",
+    "lb": "pound",
+    "lbs": "pound",
+    "gram": "gram",
+    "grams": "gram",
+    "g": "gram",
+    "kilogram": "kilogram",
+    "kilograms": "kilogram",
+    "kg": "kilogram",
+    "milliliter": "milliliter",
+    "milliliters": "milliliter",
+    "millilitre": "milliliter",
+    "millilitres": "milliliter",
+    "ml": "milliliter",
+    "liter": "liter",
+    "liters": "liter",
+    "litre": "liter",
+    "litres": "liter",
+    "l": "liter",
+    "pint": "pint",
+    "pints": "pint",
+    "pt": "pint",
+    "quart": "quart",
+    "quarts": "quart",
+    "qt": "quart",
+    "gallon": "gallon",
+    "gallons": "gallon",
+    "gal": "gallon",
+    "pinch": "pinch",
+    "pinches": "pinch",
+    "dash": "dash",
+    "dashes": "dash",
+    "clove": "clove",
+    "cloves": "clove",
+    "can": "can",
+    "cans": "can",
+    "package": "package",
+    "packages": "package",
+    "pkg": "package",
+    "stick": "stick",
+    "sticks": "stick",
+    "slice": "slice",
+    "slices": "slice",
+    "bunch": "bunch",
+    "bunches": "bunch",
+    "sprig": "sprig",
+    "sprigs": "sprig",
+}
+
+_CASE_SENSITIVE = sorted((alias for alias in UNITS if alias != alias.lower() or len(alias) == 1), key=len, reverse=True)
+_CASE_INSENSITIVE = sorted((alias for alias in UNITS if alias not in _CASE_SENSITIVE), key=len, reverse=True)
+_UNITS_LOWER = {alias.lower(): unit for alias, unit in UNITS.items() if alias in _CASE_INSENSITIVE}
+
+# Fractions need a non-zero denominator; a whole number must not be the start of a rejected fraction
+_NUMBER = r"\d+\s+\d+/0*[1-9]\d*|\d+/0*[1-9]\d*|\d*\.\d+|\d+(?![\d/])"
+_LINE = re.compile(
+    rf"""
+    ^\s*
+    (?:(?P<quantity>{_NUMBER})
+       (?:\s*(?:-|\u2013|to)\s*(?P<quantity_max>{_NUMBER}))?
+       \s*)?
+    (?:(?P<unit>(?i:{"|".join(map(re.escape, _CASE_INSENSITIVE))})|{"|".join(map(re.escape, _CASE_SENSITIVE))})
+       (?![A-Za-z-])\.?(?:\s+of\b)?\s*)?
+    (?P<rest>.*?)\s*$
+    """,
+    re.VERBOSE,
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _parse_number(value: str | None) -> float | None:
+    """Convert "1 1/2", "3/4", ".5" or "2" to a float."""
+    if value is None:
+        return None
+    return float(sum(Fraction(part) for part in value.split()))
+
+
+@lru_cache(maxsize=32768)
+def parse_ingredient(line: str) -> ParsedIngredient:
+    """Parse an ingredient line into quantity, unit, name and note.
+
+    Results are memoized, since the same lines recur across a recipe library.
+
+    Args:
+        line: The ingredient line, e.g. ``"1 1/2 cups flour, sifted"``.
+
+    Returns:
+        The parsed ingredient. Lines without a recognizable quantity or unit
+        keep the whole text as the name.
+
+    Example:
+        >>> parse_ingredient("2-3 tbsp olive oil, divided")
+        ParsedIngredient(text='2-3 tbsp olive oil, divided', quantity=2.0, quantityMax=3.0,
+                         unit='tablespoon', name='olive oil', note='divided')
+    """
+    text = _WHITESPACE.sub(" ", convert_characters(line)).strip()
+    match = _LINE.match(text)
+    if match is None:  # pragma: no cover - the pattern matches any single line
+        return ParsedIngredient(text=text, name=text)
+
+    unit = match["unit"]
+    quantity = _parse_number(match["quantity"])
+    name, _, note = match["rest"].partition(",")
+    # A unit word with no quantity and nothing after it but a note is the name, not a unit
+    if unit is not None and quantity is None and not name.strip():
+        name, unit = unit, None
+
+    return ParsedIngredient(
+        text=text,
+        quantity=quantity,
+        quantityMax=_parse_number(match["quantity_max"]),
+        unit=None if unit is None else UNITS.get(unit) or _UNITS_LOWER[unit.lower()],
+        name=name.strip() or text,
+        note=note.strip() or None,
+    )
+
+
+def parse_ingredients(lines: Iterable[str]) -> list[ParsedIngredient]:
+    """Parse a batch of ingredient lines, reusing cached results for repeated lines."""
+    return [parse_ingredient(line) for line in lines]
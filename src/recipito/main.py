@@ -1,6 +1,9 @@
-import json
+import sys
 import urllib.parse
 
+from collections.abc import Iterable
+from datetime import UTC
+from datetime import datetime
 from pathlib import Path
 from typing import Annotated
 
@@ -9,7 +12,29 @@ import typer
 
 from bs4 import BeautifulSoup
 
+from recipito.archive import ARCHIVE_FORMATS
+from recipito.archive import DEFAULT_ARCHIVE_FORMAT
+from recipito.archive import RecipeArchive
+from recipito.archive import check_archive_format
+from recipito.crawl import DEFAULT_MAX_PAGES
+from recipito.crawl import Crawler
+from recipito.deadline import DEFAULT_DEADLINE
+from recipito.deadline import DEFAULT_STAGE_BUDGETS
+from recipito.deadline import Deadline
+from recipito.deadline import DeadlineExceededError
+from recipito.dedupe import RecipeIndex
+from recipito.dedupe import canonicalize_url
+from recipito.images import DEFAULT_TARGET_WIDTH
+from recipito.images import ImageStore
 from recipito.logger import logger, console
+from recipito.models import RunEntry
+from recipito.models import RunRecord
+from recipito.profiling import profiler
+from recipito.serialize import dumps
+from recipito.serialize import loads
+from recipito.shard import merge_outputs
+from recipito.shard import parse_shard
+from recipito.shard import shard_for
 from recipito.utils import save_nextcloud_recipe
 
 app = typer.Typer(help="URL processor application")
@@ -18,6 +43,15 @@ app = typer.Typer(help="URL processor application")
 MAX_FILENAME_LENGTH = 100
 
 
+def recipe_image_urls(content: str) -> list[str]:
+    """Return the image URLs of extracted recipe JSON, or an empty list if it has no usable ones."""
+    recipe = loads(content)
+    urls = recipe.get("imageUrls") if isinstance(recipe, dict) else None
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        return []
+    return urls
+
+
 def sanitize_filename(title: str) -> str:
     """
     Convert title to a valid filename across platforms.
@@ -48,41 +82,274 @@ def sanitize_filename(title: str) -> str:
     return clean_title
 
 
-def get_page_title(url: str) -> str:
-    """Fetch the title of a webpage using requests and BeautifulSoup."""
+def get_page_title(url: str, deadline: Deadline | None = None) -> str:
+    """Fetch the title of a webpage using requests and BeautifulSoup.
+
+    Raises:
+        DeadlineExceededError: If the deadline's title stage runs out.
+    """
+    deadline = deadline or Deadline()
     try:
         logger.info("[blue]Fetching page title from:[/] %s", url)
-        response = requests.get(url)
-        response.raise_for_status()
+        with deadline.stage("title") as timeout:
+            response = requests.get(url, stream=True, timeout=timeout)
+            response.raise_for_status()
+            deadline.read(response)
         soup = BeautifulSoup(response.text, "html.parser")
         title = soup.title
         if title is None or title.string is None:
             logger.warning("[yellow]No title found for URL:[/] %s", url)
             return "Error: No title found"
         return title.string.strip()
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.error("[red]Error fetching title:[/] %s", e)
         return f"Error fetching title: {e!s}"
 
 
-def get_recipe_content(url: str) -> str:
-    """Fetch recipe content from justtherecipe.com."""
+def get_recipe_content(url: str, deadline: Deadline | None = None) -> str:
+    """Fetch recipe content from justtherecipe.com.
+
+    Raises:
+        DeadlineExceededError: If the deadline's extract stage runs out.
+    """
+    deadline = deadline or Deadline()
     try:
         recipe_url = f"https://www.justtherecipe.com/extractRecipeAtUrl?url={urllib.parse.quote(url)}"
         logger.info("[blue]Fetching recipe from:[/] %s", recipe_url)
-        response = requests.get(recipe_url)
-        response.raise_for_status()
-        return json.dumps(response.json(), indent=2)
+        with deadline.stage("extract") as timeout:
+            response = requests.get(recipe_url, stream=True, timeout=timeout)
+            response.raise_for_status()
+            deadline.read(response)
+        return dumps(loads(response.content))
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.error("[red]Error fetching recipe:[/] %s", e)
         return f"Error fetching recipe: {e!s}"
 
 
-@app.command()
-def main(
+KeywordsOption = Annotated[list[str] | None, typer.Option("--keyword", "-k", help="Keywords to filter recipes")]
+CategoryOption = Annotated[str, typer.Option("--category", "-C", help="Recipe category")]
+SkipDuplicatesOption = Annotated[
+    bool, typer.Option("--skip-duplicates", help="Skip imported URLs and near-duplicates of existing recipes")
+]
+ImageWidthOption = Annotated[
+    int, typer.Option("--image-width", help="Minimum width of the image chosen among a recipe's candidates")
+]
+ShardOption = Annotated[
+    str | None, typer.Option("--shard", help="Only process shard i of N (i counts from 0), e.g. 0/4")
+]
+DeadlineOption = Annotated[float, typer.Option("--deadline", help="Total seconds allowed per URL, 0 for no limit")]
+ProfileOption = Annotated[
+    bool, typer.Option("--profile", help="Write a per-stage profile and flamegraph stacks to output/")
+]
+StageBudgetOption = Annotated[
+    list[str] | None,
+    typer.Option("--stage-budget", help="Seconds allowed for one stage (title, extract, image, write), e.g. image=10"),
+]
+OutputFormatOption = Annotated[
+    str,
+    typer.Option(
+        "--output-format", help="directory writes a folder per recipe, archive bundles all recipes into one file"
+    ),
+]
+ArchiveFormatOption = Annotated[
+    str, typer.Option("--archive-format", help=f"Archive type: {', '.join(ARCHIVE_FORMATS)}")
+]
+
+
+def import_urls(  # noqa: C901, PLR0912, PLR0913, PLR0915
+    urls: Iterable[str],
+    keywords: list[str],
+    category: str,
+    *,
+    skip_duplicates: bool = False,
+    image_width: int = DEFAULT_TARGET_WIDTH,
+    shard: tuple[int, int] | None = None,
+    deadline: float | None = DEFAULT_DEADLINE,
+    stage_budgets: dict[str, float] | None = None,
+    profile: bool = False,
+    archive_format: str | None = None,
+) -> RunRecord:
+    """Run each URL through extraction and saving.
+
+    URLs are pulled from the iterable one at a time, so a lazy source such as
+    a crawler only advances once the previous recipe has been saved. With a
+    shard ``(i, N)`` only URLs hashing to shard i are processed. Pages are
+    fetched from the URLs as given; their canonical form is what shards,
+    run records and, with skip_duplicates, the already-imported check go by.
+    Each URL gets ``deadline`` seconds in total and at most ``stage_budgets``
+    seconds per stage; URLs that run out are abandoned and recorded with
+    status ``timeout``. The outcome of every URL is written to a run record in
+    ``output/runs``. With profile set, a stage summary and flamegraph stacks
+    named after the run record are written to ``output`` as well.
+
+    With an archive_format, recipes are streamed into a single archive in
+    ``output`` instead of being written as recipe directories, and neither
+    the raw recipe JSON nor the image store is kept.
+    """
+    output_dir = Path("output")
+    json_dir = output_dir / "json"
+    if archive_format is None:
+        json_dir.mkdir(parents=True, exist_ok=True)
+    index = RecipeIndex.from_directory(output_dir / "nextcloud_recipes", cache_path=output_dir / "recipe-index.json")
+    record = RunRecord(
+        started=datetime.now(UTC),
+        shard=None if shard is None else f"{shard[0]}/{shard[1]}",
+        keywords=keywords,
+        category=category,
+        skip_duplicates=skip_duplicates,
+        image_width=image_width,
+        archive_format=archive_format,
+    )
+    budgets = DEFAULT_STAGE_BUDGETS if stage_budgets is None else stage_budgets
+    shard_suffix = "" if shard is None else f"-shard-{shard[0]}-of-{shard[1]}"
+    run_name = f"{record.started:%Y%m%dT%H%M%S%f}{shard_suffix}"
+    archive = None
+    if archive_format is not None:
+        archive_path = output_dir / f"nextcloud_recipes-{run_name}{ARCHIVE_FORMATS[archive_format]}"
+        archive = RecipeArchive(archive_path, archive_format)
+    # Images for an archive only live until it is closed, so they are deduplicated within it
+    image_dir = output_dir / "images" if archive is None else archive.image_dir
+    image_store = ImageStore(image_dir, target_width=image_width)
+    if profile:
+        profiler.start()
+
+    try:
+        for i, raw_url in enumerate(urls, 1):
+            url = canonicalize_url(raw_url)
+            if shard is not None and shard_for(url, shard[1]) != shard[0]:
+                continue
+            entry = RunEntry(url=url, source=None if raw_url == url else raw_url, status="failed")
+            record.entries.append(entry)
+            url_deadline = Deadline(deadline, budgets)
+            image_urls: list[str] = []
+            try:
+                existing = index.find_url(url) if skip_duplicates else None
+                if existing is not None:
+                    logger.info("[yellow]Skipping already imported URL[/] %s [yellow](saved as %s)[/]", url, existing)
+                    entry.status, entry.title = "skipped", existing
+                    continue
+
+                # The canonical URL only identifies the recipe; the page is fetched as given
+                with profiler.stage("title"):
+                    title = get_page_title(raw_url, url_deadline)
+                with profiler.stage("extract"):
+                    content = get_recipe_content(raw_url, url_deadline)
+                if not title.startswith("Error") and not content.startswith("Error"):
+                    # Start the image stage while the recipe is converted and saved
+                    image_urls = recipe_image_urls(content)
+                    image_store.prefetch(image_urls)
+
+                logger.info("[bold]URL %d:[/] %s", i, raw_url)
+                logger.info("   [blue]Title:[/] %s", title)
+                logger.info("   [blue]Recipe extracted:[/] %s", "✓" if not content.startswith("Error") else "✗")
+
+                if title.startswith("Error"):
+                    entry.error = title
+                    continue
+
+                filename = sanitize_filename(title)
+                entry.title = filename
+                saved = save_nextcloud_recipe(
+                    filename,
+                    content,
+                    keywords,
+                    category,
+                    index=index,
+                    skip_duplicates=skip_duplicates,
+                    image_store=image_store,
+                    deadline=url_deadline,
+                    archive=archive,
+                )
+                entry.status = "saved" if saved else "duplicate"
+                # The raw JSON is only kept once the recipe itself is saved, so an abandoned URL leaves nothing
+                if saved and archive is None:
+                    recipe_path = json_dir / f"{filename}.json"
+                    recipe_path.write_text(content)
+                    logger.info("[green]Saved recipe JSON to[/] %s", recipe_path)
+
+            except DeadlineExceededError as e:
+                logger.warning("[yellow]Abandoned[/] %s: %s", url, e)
+                entry.status, entry.error = "timeout", str(e)
+            except Exception as e:
+                logger.error("[red]Error processing[/] %s: %s", url, e)
+                entry.error = str(e)
+            finally:
+                # A recipe skipped or failed before its image stage no longer needs the prefetch
+                image_store.discard(image_urls)
+    finally:
+        image_store.close()
+        if archive is not None:
+            archive.close()
+        profiler.stop(output_dir, run_name)
+        record.finished = datetime.now(UTC)
+        runs_dir = output_dir / "runs"
+        runs_dir.mkdir(parents=True, exist_ok=True)
+        record_path = runs_dir / f"{run_name}.json"
+        record_path.write_text(record.model_dump_json(indent=2))
+        logger.info("[blue]Run record written to[/] %s", record_path)
+
+    return record
+
+
+def parse_shard_option(value: str | None) -> tuple[int, int] | None:
+    """Parse the --shard option, exiting with an error if it is invalid."""
+    if value is None:
+        return None
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        logger.error("[red]Invalid shard:[/] %s", e)
+        raise typer.Exit(code=1) from e
+
+
+def parse_output_format(output_format: str, archive_format: str) -> str | None:
+    """Return the archive format to write, or None for recipe directories, exiting with an error if invalid."""
+    if output_format == "directory":
+        return None
+    if output_format != "archive":
+        logger.error("[red]Output format must be directory or archive, got[/] %s", output_format)
+        raise typer.Exit(code=1)
+    try:
+        check_archive_format(archive_format)
+    except ValueError as e:
+        logger.error("[red]Invalid archive format:[/] %s", e)
+        raise typer.Exit(code=1) from e
+    return archive_format
+
+
+def parse_stage_budgets(values: list[str] | None) -> dict[str, float]:
+    """Merge --stage-budget options into the default stage budgets, exiting with an error if one is invalid."""
+    budgets = dict(DEFAULT_STAGE_BUDGETS)
+    for value in values or []:
+        stage, _, seconds = value.partition("=")
+        if stage not in DEFAULT_STAGE_BUDGETS:
+            logger.error("[red]Unknown stage in budget[/] %s", value)
+            raise typer.Exit(code=1)
+        try:
+            budgets[stage] = float(seconds)
+        except ValueError as e:
+            logger.error("[red]Invalid stage budget[/] %s: %s", value, e)
+            raise typer.Exit(code=1) from e
+    return budgets
+
+
+@app.command("fetch")
+def main(  # noqa: PLR0913, PLR0917
     urls: Annotated[list[str], typer.Argument(help="URLs to scrape")],
-    keywords: Annotated[list[str] | None, typer.Option("--keyword", "-k", help="Keywords to filter recipes")] = None,
-    category: Annotated[str, typer.Option("--category", "-C", help="Recipe category")] = "Main Course",
+    keywords: KeywordsOption = None,
+    category: CategoryOption = "Main Course",
+    skip_duplicates: SkipDuplicatesOption = False,  # noqa: FBT002
+    image_width: ImageWidthOption = DEFAULT_TARGET_WIDTH,
+    shard: ShardOption = None,
+    deadline: DeadlineOption = DEFAULT_DEADLINE,
+    stage_budget: StageBudgetOption = None,
+    profile: ProfileOption = False,  # noqa: FBT002
+    output_format: OutputFormatOption = "directory",
+    archive_format: ArchiveFormatOption = DEFAULT_ARCHIVE_FORMAT,
 ) -> None:
     """Scrape recipes from URLs and save them as JSON."""
     if not urls:
@@ -90,35 +357,138 @@ def main(
         raise typer.Exit(code=1)
 
     keywords = keywords or []
+    shard_spec = parse_shard_option(shard)
+    budgets = parse_stage_budgets(stage_budget)
+    archive_spec = parse_output_format(output_format, archive_format)
 
     logger.info("[bold blue]Processing[/] %d [bold blue]URLs[/]", len(urls))
     if keywords:
         logger.info("[blue]Using keywords:[/] %s", ", ".join(keywords))
 
-    output_dir = Path("output")
-    json_dir = output_dir / "json"
-    json_dir.mkdir(parents=True, exist_ok=True)
+    import_urls(
+        urls,
+        keywords,
+        category,
+        skip_duplicates=skip_duplicates,
+        image_width=image_width,
+        shard=shard_spec,
+        deadline=deadline or None,
+        stage_budgets=budgets,
+        profile=profile,
+        archive_format=archive_spec,
+    )
 
-    for i, url in enumerate(urls, 1):
-        try:
-            title = get_page_title(url)
-            content = get_recipe_content(url)
 
-            logger.info("[bold]URL %d:[/] %s", i, url)
-            logger.info("   [blue]Title:[/] %s", title)
-            logger.info("   [blue]Recipe extracted:[/] %s", "✓" if not content.startswith("Error") else "✗")
+@app.command()
+def crawl(  # noqa: PLR0913, PLR0917
+    start_urls: Annotated[list[str], typer.Argument(help="Sitemap, sitemap index or category page URLs")],
+    match: Annotated[str | None, typer.Option("--match", "-m", help="Regex recipe URLs must match")] = None,
+    follow: Annotated[
+        str | None, typer.Option("--follow", "-f", help="Regex for listing page links to crawl further")
+    ] = None,
+    max_pages: Annotated[int, typer.Option("--max-pages", help="Maximum number of pages to crawl")] = DEFAULT_MAX_PAGES,
+    keywords: KeywordsOption = None,
+    category: CategoryOption = "Main Course",
+    skip_duplicates: SkipDuplicatesOption = False,  # noqa: FBT002
+    image_width: ImageWidthOption = DEFAULT_TARGET_WIDTH,
+    shard: ShardOption = None,
+    deadline: DeadlineOption = DEFAULT_DEADLINE,
+    stage_budget: StageBudgetOption = None,
+    profile: ProfileOption = False,  # noqa: FBT002
+    output_format: OutputFormatOption = "directory",
+    archive_format: ArchiveFormatOption = DEFAULT_ARCHIVE_FORMAT,
+) -> None:
+    """Discover recipe URLs from sitemaps or category pages and import them."""
+    if not start_urls:
+        logger.error("[red]No URLs provided[/]")
+        raise typer.Exit(code=1)
+
+    keywords = keywords or []
+    shard_spec = parse_shard_option(shard)
+    budgets = parse_stage_budgets(stage_budget)
+    archive_spec = parse_output_format(output_format, archive_format)
+    logger.info("[bold blue]Crawling[/] %d [bold blue]start URLs[/]", len(start_urls))
 
-            if not title.startswith("Error"):
-                filename = sanitize_filename(title)
-                recipe_path = json_dir / f"{filename}.json"
-                recipe_path.write_text(content)
-                logger.info("[green]Saved recipe JSON to[/] %s", recipe_path)
+    crawler = Crawler(start_urls, match=match, follow=follow, max_pages=max_pages)
+    import_urls(
+        crawler,
+        keywords,
+        category,
+        skip_duplicates=skip_duplicates,
+        image_width=image_width,
+        shard=shard_spec,
+        deadline=deadline or None,
+        stage_budgets=budgets,
+        profile=profile,
+        archive_format=archive_spec,
+    )
 
-                save_nextcloud_recipe(filename, content, keywords, category)
 
-        except Exception as e:
-            logger.error("[red]Error processing[/] %s: %s", url, e)
+@app.command()
+def retry(
+    records: Annotated[list[Path], typer.Argument(help="Run records from output/runs")],
+    status: Annotated[
+        list[str] | None, typer.Option("--status", "-s", help="Outcomes to retry (default: timeout)")
+    ] = None,
+    deadline: DeadlineOption = DEFAULT_DEADLINE,
+    stage_budget: StageBudgetOption = None,
+) -> None:
+    """Import again the URLs that timed out (or had another outcome) in earlier runs.
+
+    Each run's keywords, category, shard and output settings are reused.
+    """
+    statuses = set(status or ["timeout"])
+    budgets = parse_stage_budgets(stage_budget)
+    for record_path in records:
+        record = RunRecord.model_validate_json(record_path.read_text())
+        urls = list(dict.fromkeys(entry.source or entry.url for entry in record.entries if entry.status in statuses))
+        logger.info("[bold blue]Retrying[/] %d [bold blue]URLs from[/] %s", len(urls), record_path)
+        if urls:
+            import_urls(
+                urls,
+                record.keywords,
+                record.category,
+                skip_duplicates=record.skip_duplicates,
+                image_width=record.image_width or DEFAULT_TARGET_WIDTH,
+                shard=None if record.shard is None else parse_shard(record.shard),
+                deadline=deadline or None,
+                stage_budgets=budgets,
+                archive_format=record.archive_format,
+            )
+
+
+@app.command()
+def merge(
+    sources: Annotated[list[Path], typer.Argument(help="Output directories of the shard workers")],
+    into: Annotated[Path, typer.Option("--into", "-o", help="Output directory of the merged library")] = Path("output"),
+) -> None:
+    """Merge the output trees and run records of several workers into one library."""
+    if not sources:
+        logger.error("[red]No output directories provided[/]")
+        raise typer.Exit(code=1)
+    if any(source.resolve() == into.resolve() for source in sources):
+        logger.error("[red]Cannot merge a directory into itself:[/] %s", into)
+        raise typer.Exit(code=1)
+
+    merge_outputs(sources, into)
+
+
+# Options handled by the command group itself rather than by a command
+GROUP_OPTIONS = ("--help", "--install-completion", "--show-completion")
+
+
+def run(args: list[str] | None = None) -> None:
+    """Run the command line, treating ``recipito URL...`` as ``recipito fetch URL...``.
+
+    Importing used to be the only command, so invocations without a command
+    name keep working.
+    """
+    args = sys.argv[1:] if args is None else args
+    commands = typer.main.get_group(app).commands
+    if args and args[0] not in commands and args[0] not in GROUP_OPTIONS:
+        args = ["fetch", *args]
+    app(args, prog_name="recipito")
 
 
 if __name__ == "__main__":
-    app()
+    run()
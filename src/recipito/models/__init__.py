@@ -1,17 +1,25 @@
 """Recipe models."""
 
+from .image import ImageCandidate
+from .ingredient import ParsedIngredient
 from .just_the_recipe import JustTheRecipe
 from .just_the_recipe import JustTheRecipeIngredient
 from .just_the_recipe import JustTheRecipeInstructionGroup
 from .just_the_recipe import JustTheRecipeNutritionInfo
 from .just_the_recipe import JustTheRecipeStep
 from .nextcloud import NextcloudRecipe
+from .run import RunEntry
+from .run import RunRecord
 
 __all__ = [
+    "ImageCandidate",
     "JustTheRecipe",
     "JustTheRecipeIngredient",
     "JustTheRecipeInstructionGroup",
     "JustTheRecipeNutritionInfo",
     "JustTheRecipeStep",
     "NextcloudRecipe",
+    "ParsedIngredient",
+    "RunEntry",
+    "RunRecord",
 ]
@@ -0,0 +1,17 @@
+"""Image candidate models."""
+
+from pydantic import BaseModel
+
+
+class ImageCandidate(BaseModel):
+    """Represents a probed recipe image URL."""
+
+    url: str
+    width: int | None = None
+    height: int | None = None
+    contentLength: int | None = None
+
+    @property
+    def pixels(self) -> int:
+        """Return the image area, or 0 if the dimensions are unknown."""
+        return (self.width or 0) * (self.height or 0)
@@ -0,0 +1,17 @@
+"""Structured ingredient models."""
+
+from pydantic import BaseModel
+from pydantic import ConfigDict
+
+
+class ParsedIngredient(BaseModel):
+    """Represents an ingredient line split into quantity, unit and name."""
+
+    model_config = ConfigDict(frozen=True)
+
+    text: str
+    quantity: float | None = None
+    quantityMax: float | None = None
+    unit: str | None = None
+    name: str
+    note: str | None = None
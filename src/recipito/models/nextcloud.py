@@ -1,14 +1,15 @@
 """Nextcloud recipe models."""
 
-import json
-
 from datetime import UTC
 from datetime import datetime
 from typing import Any
 
 from pydantic import BaseModel
 from pydantic import Field
+from pydantic import field_serializer
 
+from recipito.serialize import NEXTCLOUD_DATE_FORMAT
+from recipito.serialize import escape_non_ascii
 from recipito.text import convert_characters
 
 from .just_the_recipe import JustTheRecipe
@@ -42,21 +43,20 @@ class NextcloudRecipe(BaseModel):
     printImage: bool = True
     imageUrl: str = "/apps/cookbook/webapp/recipes/{}/image?size=full"
 
-    def model_dump_json(self, **kwargs: Any) -> str:
-        """Override JSON serialization to handle datetime."""
-        # Extract json.dumps kwargs
-        json_kwargs = {"indent": kwargs.pop("indent", 2)}
-
-        # Get model data with remaining kwargs
-        data = self.model_dump(by_alias=True, **kwargs)
+    @field_serializer("dateModified", "dateCreated", "datePublished", when_used="json-unless-none")
+    def serialize_date(self, value: datetime) -> str:
+        """Write dates the way Nextcloud Cookbook does."""
+        return value.strftime(NEXTCLOUD_DATE_FORMAT)
 
-        # Format datetime fields
-        for field in ["dateModified", "dateCreated", "datePublished"]:
-            if field in data and data[field] is not None:
-                data[field] = data[field].strftime("%Y-%m-%dT%H:%M:%S+0000")
-
-        # Return JSON string
-        return json.dumps(data, **json_kwargs)
+    def model_dump_json(self, **kwargs: Any) -> str:
+        """Serialize to recipe.json, indented and with aliases by default.
+
+        Non-ASCII characters are escaped, so the output matches what
+        ``json.dumps`` writes.
+        """
+        kwargs.setdefault("indent", 2)
+        kwargs.setdefault("by_alias", True)
+        return escape_non_ascii(super().model_dump_json(**kwargs))
 
 
 def convert_to_nextcloud_format(raw_recipe: dict[str, Any], category: str = "Main Course") -> dict[str, Any]:
@@ -0,0 +1,34 @@
+"""Import run record models."""
+
+from datetime import datetime
+
+from pydantic import BaseModel
+from pydantic import Field
+
+
+class RunEntry(BaseModel):
+    """Represents the outcome of importing a single URL.
+
+    ``url`` is the canonical form used to match recipes across runs, and
+    ``source`` the URL as given when that differs from it.
+    """
+
+    url: str
+    source: str | None = None
+    status: str
+    title: str | None = None
+    error: str | None = None
+
+
+class RunRecord(BaseModel):
+    """Represents one import run and the outcome of every URL it processed."""
+
+    started: datetime
+    finished: datetime | None = None
+    shard: str | None = None
+    keywords: list[str] = Field(default_factory=list)
+    category: str = "Main Course"
+    skip_duplicates: bool = False
+    image_width: int | None = None
+    archive_format: str | None = None
+    entries: list[RunEntry] = Field(default_factory=list)
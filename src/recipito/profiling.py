@@ -0,0 +1,202 @@
+"""Pipeline profiling."""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+from collections import Counter
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from contextlib import contextmanager
+from contextlib import nullcontext
+from pathlib import Path
+from types import FrameType
+from typing import ParamSpec
+from typing import TypeVar
+
+from recipito.logger import logger
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 40
+
+_DISABLED = nullcontext()
+# From Python 3.12 cProfile is built on sys.monitoring and sees every thread;
+# before that it only sees the thread that enabled it.
+_PROFILE_SEES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).stem}:{code.co_name}"
+
+
+class Profiler:
+    """Collects per-stage timings, peak memory and call stacks for an import.
+
+    While stopped, ``stage()`` returns a shared no-op context manager, so the
+    instrumentation left in the pipeline costs one attribute check per stage.
+    While running, the import is profiled with cProfile, including the work
+    worker threads run through ``task()``, every thread is sampled for a
+    flamegraph, and tracemalloc tracks the peak memory of each stage.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self.enabled = False
+        self.current_stage = ""
+        self.stage_seconds: Counter[str] = Counter()
+        self.stage_calls: Counter[str] = Counter()
+        self.stage_peak_bytes: dict[str, int] = {}
+        self.stacks: Counter[str] = Counter()
+        self._profile: cProfile.Profile | None = None
+        self._worker_stats: pstats.Stats | None = None
+        self._worker_lock = threading.Lock()
+        self._sampler: threading.Thread | None = None
+        self._stop_sampling = threading.Event()
+
+    def stage(self, name: str) -> AbstractContextManager[None]:
+        """Return a context manager attributing the enclosed work to a pipeline stage."""
+        if not self.enabled:
+            return _DISABLED
+        return self._measure(name)
+
+    def task(self, func: Callable[P, T]) -> Callable[P, T]:
+        """Wrap a function run on a worker thread so that its calls are profiled too.
+
+        Returns func itself while stopped, or when cProfile already sees every thread.
+        """
+        if not self.enabled or _PROFILE_SEES_ALL_THREADS:
+            return func
+
+        def profiled(*args: P.args, **kwargs: P.kwargs) -> T:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._worker_lock:
+                    if self._worker_stats is None:
+                        self._worker_stats = pstats.Stats(profile)
+                    else:
+                        self._worker_stats.add(profile)
+
+        return profiled
+
+    def stats(self) -> pstats.Stats | None:
+        """Return the cProfile statistics of the importing and worker threads."""
+        if self._profile is None:
+            return None
+        stats = pstats.Stats(self._profile)
+        with self._worker_lock:
+            if self._worker_stats is not None:
+                stats.add(self._worker_stats)
+        return stats
+
+    @contextmanager
+    def _measure(self, name: str) -> Iterator[None]:
+        previous = self.current_stage
+        self.current_stage = name
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] += time.perf_counter() - started
+            self.stage_calls[name] += 1
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            self.stage_peak_bytes[name] = max(self.stage_peak_bytes.get(name, 0), peak)
+            self.current_stage = previous
+
+    def _sample(self) -> None:
+        """Record the stack of every other thread until stopped."""
+        own_id = threading.get_ident()
+        while not self._stop_sampling.wait(self.interval):
+            # Idents are reused once a thread exits, so names are looked up afresh on every tick
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():  # noqa: SLF001 - stdlib sampling hook
+                if thread_id == own_id:
+                    continue
+                labels = []
+                current: FrameType | None = frame
+                while current is not None:
+                    labels.append(_frame_label(current))
+                    current = current.f_back
+                root = names.get(thread_id, str(thread_id))
+                if root == "MainThread" and self.current_stage:
+                    root = f"{root};stage:{self.current_stage}"
+                self.stacks[";".join([root, *reversed(labels)])] += 1
+
+    def start(self) -> None:
+        """Start profiling, discarding the results of any earlier run."""
+        self.stage_seconds.clear()
+        self.stage_calls.clear()
+        self.stage_peak_bytes.clear()
+        self.stacks.clear()
+        self._worker_stats = None
+        self.enabled = True
+        tracemalloc.start()
+        self._profile = cProfile.Profile()
+        self._stop_sampling.clear()
+        self._sampler = threading.Thread(target=self._sample, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+        self._profile.enable()
+
+    def stop(self, output_dir: Path, run_name: str) -> Path | None:
+        """Stop profiling and write the reports to output_dir.
+
+        Writes a ranked text summary, a collapsed-stack file for flamegraph
+        tools and the raw cProfile statistics, named after the run record
+        they belong to.
+
+        Returns:
+            The path of the summary, or None if profiling was not running.
+        """
+        if not self.enabled or self._profile is None:
+            return None
+        self._profile.disable()
+        self._stop_sampling.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        tracemalloc.stop()
+        self.enabled = False
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        prefix = output_dir / f"profile-{run_name}"
+        summary_path = prefix.with_name(prefix.name + "-summary.txt")
+        summary_path.write_text(self.summary())
+        prefix.with_name(prefix.name + "-stacks.txt").write_text(
+            "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        )
+        stats = self.stats()
+        if stats is not None:
+            stats.dump_stats(prefix.with_name(prefix.name + ".prof"))
+        logger.info("[blue]Profile written to[/] %s", summary_path)
+        return summary_path
+
+    def summary(self) -> str:
+        """Return the stage table followed by the functions ranked by cumulative time."""
+        lines = [f"{'stage':<12} {'calls':>6} {'seconds':>10} {'peak MiB':>10}"]
+        for name, seconds in self.stage_seconds.most_common():
+            peak = self.stage_peak_bytes.get(name, 0) / 2**20
+            lines.append(f"{name:<12} {self.stage_calls[name]:>6} {seconds:>10.3f} {peak:>10.2f}")
+
+        stats = self.stats()
+        if stats is not None:
+            stream = io.StringIO()
+            stats.stream = stream  # type: ignore[attr-defined]
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+            lines.extend(["", stream.getvalue()])
+        return "\n".join(lines) + "\n"
+
+
+profiler = Profiler()
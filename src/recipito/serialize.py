@@ -0,0 +1,93 @@
+"""JSON serialization."""
+
+import codecs
+import json
+
+from typing import Any
+
+import pydantic_core
+
+try:
+    import orjson
+except ImportError:  # Optional, speeds up parsing
+    orjson = None
+
+# Timestamp format of the dates in a Nextcloud Cookbook recipe.json
+NEXTCLOUD_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S+0000"
+
+# Error handler escaping non-ASCII characters as json.dumps does by default
+_ESCAPE_ERRORS = "recipito.json"
+
+
+def _escape(error: UnicodeError) -> tuple[str, int]:
+    if not isinstance(error, UnicodeEncodeError):
+        raise error
+    escaped = []
+    for char in error.object[error.start : error.end]:
+        code = ord(char)
+        if code < 0x10000:  # noqa: PLR2004
+            escaped.append(f"\\u{code:04x}")
+        else:
+            code -= 0x10000
+            escaped.append(f"\\u{0xD800 | (code >> 10):04x}\\u{0xDC00 | (code & 0x3FF):04x}")
+    return "".join(escaped), error.end
+
+
+codecs.register_error(_ESCAPE_ERRORS, _escape)
+
+
+def escape_non_ascii(text: str) -> str:
+    """Escape non-ASCII characters in JSON text the way json.dumps does by default."""
+    if "\x7f" in text:
+        text = text.replace("\x7f", "\\u007f")
+    if text.isascii():
+        return text
+    return text.encode("ascii", _ESCAPE_ERRORS).decode("ascii")
+
+
+def _has_small_float(text: bytes) -> bool:
+    """Return whether pydantic may have written a float differently from json.dumps.
+
+    Below 1e-4 pydantic uses fixed notation or an unpadded exponent, such as
+    ``0.00001`` or ``1e-7`` where json.dumps writes ``1e-05`` and ``1e-07``.
+    Strings can trigger a false positive, which only costs a slower dump.
+    """
+    if b"0.0000" in text:
+        return True
+    position = text.find(b"e-")
+    while position != -1:
+        exponent = text[position + 2 : position + 4]
+        if text[position - 1 : position].isdigit() and exponent[:1].isdigit() and not exponent[1:].isdigit():
+            return True
+        position = text.find(b"e-", position + 2)
+    return False
+
+
+def dumps(data: Any) -> str:
+    """Serialize data as JSON indented by two spaces.
+
+    The output is identical to ``json.dumps(data, indent=2)``, but is produced
+    by pydantic's Rust serializer, which also accepts pydantic models directly.
+    Data that serializer cannot reproduce exactly, such as tiny floats, falls
+    back to the standard library.
+    """
+    try:
+        text = pydantic_core.to_json(data, indent=2, inf_nan_mode="constants")
+    except ValueError:
+        return json.dumps(data, indent=2)
+    if _has_small_float(text):
+        return json.dumps(pydantic_core.to_jsonable_python(data), indent=2)
+    return escape_non_ascii(text.decode())
+
+
+def loads(data: str | bytes) -> Any:
+    """Parse JSON text with orjson if it is installed, or pydantic's parser otherwise.
+
+    Anything these reject but the standard library accepts is parsed by the
+    standard library instead. orjson reads integers beyond 64 bits as floats,
+    which recipe data never contains.
+    """
+    try:
+        return pydantic_core.from_json(data) if orjson is None else orjson.loads(data)
+    except ValueError:
+        return json.loads(data)
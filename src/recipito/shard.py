@@ -0,0 +1,149 @@
+"""Splitting imports across workers and merging their output."""
+
+import hashlib
+import shutil
+
+from collections.abc import Sequence
+from pathlib import Path
+
+from recipito.dedupe import url_key
+from recipito.images import link_file
+from recipito.logger import logger
+from recipito.serialize import loads
+
+RECIPES_DIR = "nextcloud_recipes"
+# Per-title files written next to the Nextcloud tree, moved along with a renamed recipe
+TITLE_FILE_DIRS = ("json", "ingredients")
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse a shard specification of the form ``i/N`` with ``0 <= i < N``.
+
+    Raises:
+        ValueError: If the specification is malformed or out of range.
+    """
+    index, _, count = value.partition("/")
+    try:
+        shard, shards = int(index), int(count)
+    except ValueError:
+        msg = f"Shard must look like i/N, got {value!r}"
+        raise ValueError(msg) from None
+    if shards < 1 or not 0 <= shard < shards:
+        msg = f"Shard index must be between 0 and {shards - 1}, got {value!r}"
+        raise ValueError(msg)
+    return shard, shards
+
+
+def shard_for(url: str, shards: int) -> int:
+    """Return the shard a URL belongs to.
+
+    The hash is taken over the canonical URL, so every worker assigns the same
+    recipe to the same shard however the URL was written.
+    """
+    digest = hashlib.blake2b(url_key(url).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def _recipe_url_key(recipe_dir: Path) -> str:
+    try:
+        return url_key(loads((recipe_dir / "recipe.json").read_bytes()).get("url", ""))
+    except (OSError, ValueError):
+        return ""
+
+
+def _copy_tree_files(source: Path, destination: Path) -> None:
+    """Copy files from source into destination, hardlinking images instead of copying them."""
+    destination.mkdir(parents=True, exist_ok=True)
+    for path in source.iterdir():
+        if not path.is_file():
+            continue
+        if path.suffix == ".jpg":
+            link_file(path, destination / path.name)
+        else:
+            shutil.copyfile(path, destination / path.name)
+
+
+def _merge_images(source: Path, destination: Path) -> None:
+    """Merge a content-addressed image store into another."""
+    if not source.is_dir():
+        return
+    destination.mkdir(parents=True, exist_ok=True)
+    for image in source.glob("*.jpg"):
+        if not (destination / image.name).exists():
+            link_file(image, destination / image.name)
+
+    urls_path = source / "urls.tsv"
+    if urls_path.exists():
+        merged_urls = destination / "urls.tsv"
+        known = set(merged_urls.read_text().splitlines()) if merged_urls.exists() else set()
+        with merged_urls.open("a") as f:
+            for line in urls_path.read_text().splitlines():
+                if line and line not in known:
+                    known.add(line)
+                    f.write(line + "\n")
+
+
+def _merge_runs(source: Path, destination: Path) -> None:
+    """Copy run records, keeping the first copy of any record name."""
+    if not source.is_dir():
+        return
+    destination.mkdir(parents=True, exist_ok=True)
+    for record in source.glob("*.json"):
+        if not (destination / record.name).exists():
+            shutil.copyfile(record, destination / record.name)
+
+
+def merge_outputs(sources: Sequence[Path], destination: Path) -> dict[Path, str]:
+    """Merge the output trees of several workers into one library.
+
+    Recipes are placed in title order, so the result does not depend on the
+    order of sources. A title that is already taken by the same source URL is
+    skipped; one taken by a different recipe gets the first free ``"title (n)"``
+    name.
+
+    Args:
+        sources: Output directories written by the individual workers.
+        destination: Output directory of the merged library, may already exist.
+
+    Returns:
+        The title each merged source recipe directory was saved under.
+    """
+    recipes_dir = destination / RECIPES_DIR
+    recipes_dir.mkdir(parents=True, exist_ok=True)
+    taken = {path.name: _recipe_url_key(path) for path in recipes_dir.iterdir() if path.is_dir()}
+
+    incoming = sorted(
+        (path.name, _recipe_url_key(path), str(source), path)
+        for source in sources
+        for path in (source / RECIPES_DIR).glob("*")
+        if (path / "recipe.json").exists()
+    )
+
+    merged: dict[Path, str] = {}
+    for title, key, source_name, recipe_dir in incoming:
+        final_title, suffix = title, 1
+        while final_title in taken and taken[final_title] != key:
+            suffix += 1
+            final_title = f"{title} ({suffix})"
+        if final_title in taken:
+            logger.info("[yellow]Already merged:[/] %s", final_title)
+            merged[recipe_dir] = final_title
+            continue
+        if final_title != title:
+            logger.warning("[yellow]Title collision, saving[/] %s [yellow]as[/] %s", title, final_title)
+
+        taken[final_title] = key
+        merged[recipe_dir] = final_title
+        _copy_tree_files(recipe_dir, recipes_dir / final_title)
+        for subdir in TITLE_FILE_DIRS:
+            title_file = Path(source_name) / subdir / f"{title}.json"
+            if title_file.exists():
+                (destination / subdir).mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(title_file, destination / subdir / f"{final_title}.json")
+
+    for source in sources:
+        _merge_images(source / "images", destination / "images")
+        _merge_runs(source / "runs", destination / "runs")
+
+    logger.info("[bold green]Merged[/] %d [bold green]recipes into[/] %s", len(merged), recipes_dir)
+    return merged
@@ -1,5 +1,10 @@
 """Text processing utilities."""
 
+import re
+
+# A digit directly followed by a unicode fraction, as in "1½"
+_MIXED_FRACTION = re.compile(r"(?<=\d)(?=[\u00bc-\u00be\u2150-\u215e])")
+
 
 def convert_characters(text: str) -> str:
     """Convert unicode fractions and symbols to standard text.
@@ -16,6 +21,8 @@ def convert_characters(text: str) -> str:
     Example:
         >>> convert_characters("½ cup")
         "1/2 cup"
+        >>> convert_characters("1½ cups")
+        "1 1/2 cups"
         >>> convert_characters("25° C")
         "25° C"
     """
@@ -37,6 +44,8 @@ def convert_characters(text: str) -> str:
         "\u215e": "7/8",
         "\u00b0": "°",  # Convert unicode degree symbol to standard degree symbol
     }
+    # Keep the whole part of a mixed number apart, so "1½" does not become "11/2"
+    text = _MIXED_FRACTION.sub(" ", text)
     for unicode_char, replacement in fraction_map.items():
         text = text.replace(unicode_char, replacement)
     return text
@@ -1,17 +1,21 @@
 """Utility functions for recipe processing."""
 
-import json
-
 from datetime import UTC
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-import requests
-from PIL import Image
-import io
-
+from recipito.archive import RecipeArchive
+from recipito.deadline import Deadline
+from recipito.deadline import DeadlineExceededError
+from recipito.dedupe import RecipeIndex
+from recipito.dedupe import fingerprint_recipe
+from recipito.images import ImageStore
+from recipito.ingredients import parse_ingredients
 from recipito.logger import logger, console
+from recipito.profiling import profiler
+from recipito.serialize import dumps
+from recipito.serialize import loads
 from recipito.text import convert_characters  # Updated import
 
 from .models import JustTheRecipe
@@ -21,17 +25,8 @@ from .models import JustTheRecipeStep
 from .models import NextcloudRecipe
 
 
-class DateTimeEncoder(json.JSONEncoder):
-    """Custom JSON encoder for datetime objects."""
-
-    def default(self, o: Any) -> Any:
-        if isinstance(o, datetime):
-            return o.strftime("%Y-%m-%dT%H:%M:%S+0000")
-        return super().default(o)
-
-
-def convert_to_nextcloud_format(raw_recipe: dict[str, Any], category: str) -> dict[str, Any]:
-    """Convert raw recipe JSON to Nextcloud recipes format."""
+def build_nextcloud_recipe(raw_recipe: dict[str, Any], category: str) -> NextcloudRecipe:
+    """Convert raw recipe JSON to a Nextcloud recipe."""
     logger.info("Converting recipe to Nextcloud format")
     recipe = JustTheRecipe(**raw_recipe)
     now = datetime.now(UTC)
@@ -60,7 +55,7 @@ def convert_to_nextcloud_format(raw_recipe: dict[str, Any], category: str) -> di
     ingredients = [convert_characters(ingredient.name) for ingredient in recipe.ingredients]
 
     # Create and validate Nextcloud recipe format
-    nextcloud_recipe = NextcloudRecipe(
+    return NextcloudRecipe(
         id=str(recipe.id)[:5],
         name=recipe.name,
         description="",
@@ -83,59 +78,121 @@ def convert_to_nextcloud_format(raw_recipe: dict[str, Any], category: str) -> di
         imageUrl="/apps/cookbook/webapp/recipes/{}/image?size=full",
     )
 
-    return nextcloud_recipe.model_dump(by_alias=True)
+
+def convert_to_nextcloud_format(raw_recipe: dict[str, Any], category: str) -> dict[str, Any]:
+    """Convert raw recipe JSON to Nextcloud recipes format."""
+    return build_nextcloud_recipe(raw_recipe, category).model_dump(by_alias=True)
+
+
+def _write_recipe_dir(
+    output_dir: Path, title: str, nextcloud_recipe: NextcloudRecipe, image_store: ImageStore, image_key: str | None
+) -> None:
+    """Write a recipe directory and its structured ingredients under output_dir."""
+    # Create Nextcloud recipe directory
+    recipe_dir = output_dir / "nextcloud_recipes" / title
+    recipe_dir.mkdir(parents=True, exist_ok=True)
+
+    if image_key is not None:
+        image_path = recipe_dir / "full.jpg"
+        image_store.link(image_key, image_path)
+        logger.info("[green]Image saved to:[/] %s", image_path)
+
+    recipe_path = recipe_dir / "recipe.json"
+    recipe_path.write_text(nextcloud_recipe.model_dump_json())
+
+    # Save structured ingredients for scaling and shopping lists; the recipe is saved even if this fails
+    ingredients_dir = output_dir / "ingredients"
+    ingredients_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        parsed_ingredients = parse_ingredients(nextcloud_recipe.recipeIngredient)
+    except Exception as e:
+        logger.error("[red]Failed to parse ingredients of[/] %s: %s", title, e)
+        return
+    (ingredients_dir / f"{title}.json").write_text(dumps(parsed_ingredients))
 
 
-def save_nextcloud_recipe(
+def save_nextcloud_recipe(  # noqa: C901, PLR0913
     title: str,
     recipe_json: str,
     keywords: list[str],
     category: str = "Main Course",
-) -> None:
-    """Save recipe in Nextcloud format."""
+    *,
+    index: RecipeIndex | None = None,
+    skip_duplicates: bool = False,
+    image_store: ImageStore | None = None,
+    deadline: Deadline | None = None,
+    archive: RecipeArchive | None = None,
+) -> bool:
+    """Save recipe in Nextcloud format.
+
+    When an index is given, the converted recipe is fingerprinted and checked
+    against it; near-duplicates are logged, and skipped if skip_duplicates is set.
+    Images go through image_store (by default ``output/images``) and are linked
+    into the recipe directory. Nothing is written until the image stage is
+    done, so a recipe that runs out of its deadline leaves no partial output.
+    With an archive, the recipe directory is appended to it instead, and no
+    structured ingredients file is written.
+
+    Returns:
+        False if the recipe was skipped as a duplicate, True once it is saved.
+
+    Raises:
+        DeadlineExceededError: If the image or write stage runs out of time.
+    """
+    deadline = deadline or Deadline()
     logger.info("[bold blue]Converting recipe to Nextcloud format[/]")
-    recipe_data = json.loads(recipe_json)
-    nextcloud_data = convert_to_nextcloud_format(recipe_data, category)
+    with profiler.stage("convert"):
+        recipe_data = loads(recipe_json)
+        nextcloud_recipe = build_nextcloud_recipe(recipe_data, category)
+
+    signature = None
+    if index is not None:
+        with profiler.stage("dedupe"):
+            signature = fingerprint_recipe(
+                {
+                    "recipeIngredient": nextcloud_recipe.recipeIngredient,
+                    "recipeInstructions": nextcloud_recipe.recipeInstructions,
+                }
+            )
+            duplicate = index.find_duplicate(signature)
+        if duplicate is not None:
+            logger.warning("[yellow]Recipe[/] %s [yellow]looks like a duplicate of[/] %s", title, duplicate)
+            if skip_duplicates:
+                logger.info("[yellow]Skipping duplicate recipe:[/] %s", title)
+                return False
 
     # Add keywords if provided
     if keywords:
-        nextcloud_data["keywords"] = ", ".join(keywords)
+        nextcloud_recipe.keywords = ", ".join(keywords)
 
-    # Create Nextcloud recipe directory
     output_dir = Path("output")
-    recipe_dir = output_dir / "nextcloud_recipes" / title
-    recipe_dir.mkdir(parents=True, exist_ok=True)
+    if image_store is None:
+        image_store = ImageStore(output_dir / "images")
 
-    # Save recipe.json with custom encoder for datetime
-    recipe_path = recipe_dir / "recipe.json"
-    recipe_path.write_text(json.dumps(nextcloud_data, indent=2, cls=DateTimeEncoder))
-
-    # Try to download and save the first image
+    # Try to download the best image
+    image_key = None
     if recipe_data.get("imageUrls") and recipe_data["imageUrls"]:
-        image_url = recipe_data["imageUrls"][0]
         try:
-            logger.info("[blue]Downloading image from:[/] %s", image_url)
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
-
-            # Load image data into PIL Image
-            image_data = io.BytesIO(response.content)
-            image = Image.open(image_data)
-
-            # Convert to RGB if necessary (e.g., for PNG with transparency)
-            if image.mode in ("RGBA", "P"):
-                image = image.convert("RGB")
+            with profiler.stage("image"):
+                image_key = image_store.fetch_best(recipe_data["imageUrls"], timeout=deadline.start("image"))
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            logger.error("[red]Failed to download/convert image:[/] %s", e)
 
-            # Save as JPEG
-            image_path = recipe_dir / "full.jpg"
-            image.save(image_path, "JPEG", quality=85)
-            logger.info("[green]Image saved to:[/] %s", image_path)
+    deadline.start("write")
+    with profiler.stage("write"):
+        if image_key is not None:
+            nextcloud_recipe.image = "full.jpg"
 
-            # Update the recipe.json with the image path
-            nextcloud_data["image"] = "full.jpg"
-            recipe_path.write_text(json.dumps(nextcloud_data, indent=2, cls=DateTimeEncoder))
+        if archive is not None:
+            image_path = None if image_key is None else image_store.path(image_key)
+            title = archive.add_recipe(title, nextcloud_recipe.model_dump_json(), image_path)
+        else:
+            _write_recipe_dir(output_dir, title, nextcloud_recipe, image_store, image_key)
 
-        except Exception as e:
-            logger.error("[red]Failed to download/convert image:[/] %s", e)
+        if index is not None:
+            index.add(title, nextcloud_recipe.url, signature)
 
     logger.info("[bold green]Recipe saved successfully[/]")
+    return True
@@ -0,0 +1,121 @@
+"""Tests for archive output."""
+
+import io
+import json
+import tarfile
+import zipfile
+
+from pathlib import Path
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from PIL import Image
+
+from recipito.archive import RecipeArchive
+from recipito.main import import_urls
+
+RAW_RECIPE = {
+    "id": "test-id",
+    "name": "Pancakes",
+    "sourceUrl": "https://example.com/pancakes",
+    "servings": 4,
+    "ingredients": [{"name": "2 cups flour"}],
+    "instructions": [{"type": "step", "text": "Mix and fry."}],
+}
+
+
+def read_archive(path: Path) -> dict[str, bytes]:
+    """Return the contents of a zip or tar archive by entry name."""
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            return {name: archive.read(name) for name in archive.namelist()}
+    with tarfile.open(path) as archive:
+        return {member.name: archive.extractfile(member).read() for member in archive}  # type: ignore[union-attr]
+
+
+@pytest.mark.parametrize(("archive_format", "suffix"), [("zip", ".zip"), ("tar", ".tar")])
+def test_archive_uses_cookbook_layout(tmp_path: Path, archive_format: str, suffix: str) -> None:
+    """Test that each recipe becomes a folder with recipe.json and its image."""
+    image = tmp_path / "image.jpg"
+    image.write_bytes(b"jpeg data")
+    path = tmp_path / f"recipes{suffix}"
+
+    archive = RecipeArchive(path, archive_format)
+    archive.add_recipe("Pancakes", '{"name": "Pancakes"}', image)
+    archive.add_recipe("Waffles", '{"name": "Waffles"}')
+    assert archive.image_dir.is_dir()
+    archive.close()
+
+    assert not archive.image_dir.exists()
+    assert read_archive(path) == {
+        "Pancakes/recipe.json": b'{"name": "Pancakes"}',
+        "Pancakes/full.jpg": b"jpeg data",
+        "Waffles/recipe.json": b'{"name": "Waffles"}',
+    }
+
+
+def test_archive_renames_title_collisions(tmp_path: Path) -> None:
+    """Test that recipes sharing a title are archived under distinct folders."""
+    image = tmp_path / "image.jpg"
+    image.write_bytes(b"jpeg data")
+    path = tmp_path / "recipes.zip"
+
+    archive = RecipeArchive(path)
+    assert archive.add_recipe("Pancakes", '{"name": "First"}') == "Pancakes"
+    assert archive.add_recipe("Pancakes", '{"name": "Second"}', image) == "Pancakes (2)"
+    archive.close()
+
+    assert read_archive(path) == {
+        "Pancakes/recipe.json": b'{"name": "First"}',
+        "Pancakes (2)/recipe.json": b'{"name": "Second"}',
+        "Pancakes (2)/full.jpg": b"jpeg data",
+    }
+
+
+def test_zstd_archive(tmp_path: Path) -> None:
+    """Test that tar.zst archives decompress to a plain tar."""
+    zstandard = pytest.importorskip("zstandard")
+    path = tmp_path / "recipes.tar.zst"
+    archive = RecipeArchive(path, "tar.zst")
+    archive.add_recipe("Pancakes", '{"name": "Pancakes"}')
+    archive.close()
+
+    with path.open("rb") as f, tarfile.open(fileobj=zstandard.ZstdDecompressor().stream_reader(f), mode="r|") as tar:
+        assert [member.name for member in tar] == ["Pancakes/recipe.json"]
+
+
+def test_unknown_archive_format(tmp_path: Path) -> None:
+    """Test that unknown formats are rejected before anything is written."""
+    with pytest.raises(ValueError, match="Archive format"):
+        RecipeArchive(tmp_path / "recipes.rar", "rar")
+    assert not list(tmp_path.iterdir())
+
+
+def test_import_urls_writes_archive(tmp_path: Path) -> None:
+    """Test that an archive import writes one archive instead of per-recipe and per-image files."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), "orange").save(buffer, "JPEG")
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.raw.read1.side_effect = [buffer.getvalue(), b""]
+    raw_recipe = {**RAW_RECIPE, "imageUrls": ["https://example.com/pancakes.jpg"]}
+    with (
+        patch("recipito.main.Path", return_value=tmp_path),
+        patch("recipito.utils.Path", return_value=tmp_path),
+        patch("recipito.main.get_page_title", return_value="Pancakes"),
+        patch("recipito.main.get_recipe_content", return_value=json.dumps(raw_recipe)),
+        patch("recipito.images.requests.get", return_value=response),
+    ):
+        record = import_urls(["https://example.com/pancakes"], ["breakfast"], "Main Course", archive_format="tar")
+
+    assert [entry.status for entry in record.entries] == ["saved"]
+    assert not (tmp_path / "nextcloud_recipes").exists()
+    assert not (tmp_path / "json").exists()
+    assert not (tmp_path / "images").exists()
+    contents = read_archive(next(tmp_path.glob("nextcloud_recipes-*.tar")))
+    assert list(contents) == ["Pancakes/recipe.json", "Pancakes/full.jpg"]
+    recipe = json.loads(contents["Pancakes/recipe.json"])
+    assert recipe["name"] == "Pancakes"
+    assert recipe["keywords"] == "breakfast"
@@ -0,0 +1,110 @@
+"""Tests for sitemap and category page crawling."""
+
+import functools
+import gzip
+import threading
+
+from collections.abc import Generator
+from http.server import SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+from recipito.crawl import BloomFilter
+from recipito.crawl import Crawler
+from recipito.main import crawl
+
+SITEMAP_NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """Static file handler that does not log every request."""
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def static_site(tmp_path: Path) -> Generator[str]:
+    """Serve a small recipe site with sitemaps and category pages from a temporary directory."""
+    recipes = [f"/recipes/{name}" for name in ("soup", "stew", "salad", "cake")]
+    (tmp_path / "sitemap_index.xml").write_text(
+        f"<sitemapindex {SITEMAP_NS}>"
+        "<sitemap><loc>{base}/sitemap-1.xml</loc></sitemap>"
+        "<sitemap><loc>{base}/sitemap-2.xml.gz</loc></sitemap>"
+        "<sitemap><loc>{base}/sitemap-1.xml</loc></sitemap>"
+        "</sitemapindex>"
+    )
+    (tmp_path / "sitemap-1.xml").write_text(
+        f"<urlset {SITEMAP_NS}>"
+        + "".join(f"<url><loc>{{base}}{path}</loc></url>" for path in recipes[:3])
+        + "<url><loc>{base}/about</loc></url></urlset>"
+    )
+    (tmp_path / "sitemap-2.xml.gz").write_bytes(
+        gzip.compress(
+            f"<urlset {SITEMAP_NS}><url><loc>{{base}}{recipes[3]}</loc></url>"
+            f"<url><loc>{{base}}{recipes[0]}/?utm_source=feed</loc></url></urlset>".encode()
+        )
+    )
+    category = tmp_path / "category"
+    category.mkdir()
+    (category / "soups.html").write_text(
+        '<html><body><a href="/recipes/soup">Soup</a> <a href="../recipes/stew#comments">Stew</a>'
+        '<a href="https://other.example.com/recipes/x">Elsewhere</a> <a href="soups-2.html">Next</a></body></html>'
+    )
+    (category / "soups-2.html").write_text(
+        '<html><body><a href="/recipes/salad">Salad</a><a href="/recipes/soup">Soup</a>'
+        '<a href="soups.html">Previous</a></body></html>'
+    )
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(tmp_path)))
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    for sitemap in ("sitemap_index.xml", "sitemap-1.xml"):
+        path = tmp_path / sitemap
+        path.write_text(path.read_text().replace("{base}", base))
+    gz_path = tmp_path / "sitemap-2.xml.gz"
+    gz_path.write_bytes(gzip.compress(gzip.decompress(gz_path.read_bytes()).replace(b"{base}", base.encode())))
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield base
+    server.shutdown()
+    server.server_close()
+
+
+def test_bloom_filter() -> None:
+    """Test that the Bloom filter remembers added items."""
+    seen = BloomFilter(capacity=1000, error_rate=0.01)
+    assert seen.add("https://example.com/a")
+    assert not seen.add("https://example.com/a")
+    assert "https://example.com/a" in seen
+    assert "https://example.com/b" not in seen
+
+
+def test_crawl_sitemap_index(static_site: str) -> None:
+    """Test following a sitemap index into plain and gzipped sitemaps without repeats."""
+    crawler = Crawler([f"{static_site}/sitemap_index.xml"], match=r"/recipes/")
+    assert list(crawler) == [f"{static_site}/recipes/{name}" for name in ("soup", "stew", "salad", "cake")]
+    assert crawler.pages_visited == 3  # noqa: PLR2004
+
+
+def test_crawl_category_pages(static_site: str) -> None:
+    """Test following pagination on category pages while staying on the site."""
+    crawler = Crawler([f"{static_site}/category/soups.html"], match=r"/recipes/", follow=r"/category/")
+    assert list(crawler) == [f"{static_site}/recipes/{name}" for name in ("soup", "stew", "salad")]
+
+    limited = Crawler([f"{static_site}/category/soups.html"], match=r"/recipes/", follow=r"/category/", max_pages=1)
+    assert list(limited) == [f"{static_site}/recipes/soup", f"{static_site}/recipes/stew"]
+
+
+def test_crawl_command_feeds_pipeline(static_site: str) -> None:
+    """Test that the crawl command streams discovered URLs into the import pipeline."""
+    imported: list[str] = []
+    with patch("recipito.main.import_urls", side_effect=lambda urls, *_, **__: imported.extend(urls)) as mock_import:
+        crawl(start_urls=[f"{static_site}/sitemap-1.xml"], match=r"/recipes/", keywords=["soup"])
+
+    assert mock_import.call_args.args[1:] == (["soup"], "Main Course")
+    assert imported == [f"{static_site}/recipes/{name}" for name in ("soup", "stew", "salad")]
@@ -0,0 +1,150 @@
+"""Tests for per-URL deadlines."""
+
+import threading
+import time
+
+from collections.abc import Generator
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+from recipito.deadline import Deadline
+from recipito.deadline import DeadlineExceededError
+from recipito.main import get_page_title
+from recipito.main import import_urls
+from recipito.main import retry
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Serves a page whose body trickles in one byte every 50 ms."""
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(b"<html><title>Slow</title>")
+        for _ in range(100):
+            try:
+                self.wfile.write(b" ")
+                self.wfile.flush()
+            except OSError:
+                return
+            time.sleep(0.05)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class StallHandler(BaseHTTPRequestHandler):
+    """Serves the start of a page and then stops sending without closing the connection."""
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        self.wfile.write(b"<html><title>Stalled</title>")
+        self.wfile.flush()
+        time.sleep(5)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def serve(handler: type[BaseHTTPRequestHandler]) -> Generator[str]:
+    """Serve the handler on a free local port until the generator is closed."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def slow_site() -> Generator[str]:
+    """Serve a page that takes several seconds to finish."""
+    yield from serve(SlowHandler)
+
+
+@pytest.fixture
+def stalled_site() -> Generator[str]:
+    """Serve a page whose body stops arriving after the title."""
+    yield from serve(StallHandler)
+
+
+def test_stage_budget_is_capped_by_total() -> None:
+    """Test that a stage gets the smaller of its own budget and the time left overall."""
+    deadline = Deadline(10, {"title": 2})
+    title_timeout = deadline.start("title")
+    assert title_timeout is not None
+    assert 1 < title_timeout <= 2  # noqa: PLR2004
+    extract_timeout = deadline.start("extract")
+    assert extract_timeout is not None
+    assert 9 < extract_timeout <= 10  # noqa: PLR2004
+    assert Deadline().start("title") is None
+
+    with pytest.raises(DeadlineExceededError, match="write"):
+        Deadline(0).start("write")
+
+
+def test_slow_page_is_abandoned(slow_site: str) -> None:
+    """Test that a page trickling in slower than its budget is cut off."""
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceededError, match="title"):
+        get_page_title(slow_site, Deadline(30, {"title": 0.3}))
+    assert time.monotonic() - started < 2  # noqa: PLR2004
+
+
+def test_stalled_page_is_a_timeout(stalled_site: str) -> None:
+    """Test that a body which stops arriving is reported as a timeout, not a failure."""
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceededError, match="title"):
+        get_page_title(stalled_site, Deadline(30, {"title": 0.5}))
+    assert time.monotonic() - started < 2  # noqa: PLR2004
+
+
+def test_timeouts_are_recorded_and_retried(tmp_path: Path) -> None:
+    """Test that a timed-out URL is recorded and retried with the settings of its run."""
+    urls = ["https://example.com/slow", "https://example.com/broken"]
+    with (
+        patch("recipito.main.Path", return_value=tmp_path),
+        patch(
+            "recipito.main.get_page_title",
+            side_effect=[DeadlineExceededError("title"), "Error fetching title: 404"],
+        ),
+        patch("recipito.main.get_recipe_content", return_value="Error: offline"),
+    ):
+        record = import_urls(urls, ["soup"], "Dessert", skip_duplicates=True, image_width=640, shard=(0, 1))
+
+    assert [(entry.url, entry.status) for entry in record.entries] == [(urls[0], "timeout"), (urls[1], "failed")]
+
+    record_path = next((tmp_path / "runs").glob("*.json"))
+    with patch("recipito.main.import_urls") as mock_import:
+        retry(records=[record_path])
+    assert mock_import.call_args.args == ([urls[0]], ["soup"], "Dessert")
+    assert mock_import.call_args.kwargs["skip_duplicates"] is True
+    assert mock_import.call_args.kwargs["image_width"] == 640  # noqa: PLR2004
+    assert mock_import.call_args.kwargs["shard"] == (0, 1)
+    assert mock_import.call_args.kwargs["archive_format"] is None
+
+
+def test_abandoned_recipe_leaves_no_raw_json(tmp_path: Path) -> None:
+    """Test that the raw recipe JSON is only written once the recipe has been saved."""
+    with (
+        patch("recipito.main.Path", return_value=tmp_path),
+        patch("recipito.main.get_page_title", return_value="Pancakes"),
+        patch("recipito.main.get_recipe_content", return_value='{"name": "Pancakes"}'),
+        patch("recipito.main.save_nextcloud_recipe", side_effect=[DeadlineExceededError("image"), True]),
+    ):
+        timed_out = import_urls(["https://example.com/pancakes"], [], "Main Course")
+        assert not (tmp_path / "json" / "Pancakes.json").exists()
+        record = import_urls(["https://example.com/pancakes"], [], "Main Course")
+
+    assert [entry.status for entry in timed_out.entries] == ["timeout"]
+    assert [entry.status for entry in record.entries] == ["saved"]
+    assert (tmp_path / "json" / "Pancakes.json").read_text() == '{"name": "Pancakes"}'
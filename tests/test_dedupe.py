@@ -0,0 +1,117 @@
+"""Tests for near-duplicate recipe detection."""
+
+import json
+
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from recipito.dedupe import RecipeIndex
+from recipito.dedupe import canonicalize_url
+from recipito.dedupe import fingerprint_recipe
+from recipito.main import import_urls
+
+
+def make_recipe(ingredients: list[str], instructions: list[str], url: str = "https://example.com/a") -> dict[str, Any]:
+    """Build a minimal Nextcloud recipe dictionary."""
+    return {"url": url, "recipeIngredient": ingredients, "recipeInstructions": instructions}
+
+
+PANCAKES = make_recipe(
+    [f"{n} cups flour variant {n}" for n in range(10)] + ["2 eggs", "1 cup milk", "1 tbsp sugar"],
+    [
+        "Whisk the flour, sugar and a pinch of salt together in a large mixing bowl",
+        "Beat in the eggs and milk until the batter is completely smooth and glossy",
+        "Cook ladlefuls of batter in a hot buttered pan until golden on both sides",
+    ],
+)
+
+
+def test_canonicalize_url() -> None:
+    """Test that URL variants collapse to the same canonical form."""
+    expected = "https://example.com/recipes/pancakes?id=3"
+    assert canonicalize_url("https://www.Example.com/recipes/pancakes/?id=3") == expected
+    assert canonicalize_url("https://example.com/recipes/pancakes/amp/?utm_source=x&id=3#step-2") == expected
+    assert canonicalize_url("https://example.com/recipes/pancakes/print?fbclid=abc&id=3") == expected
+
+
+def test_find_url_ignores_scheme() -> None:
+    """Test that http and https variants of a URL are treated as the same recipe."""
+    index = RecipeIndex()
+    index.add("Pancakes", "http://example.com/pancakes", None)
+    assert index.find_url("https://www.example.com/pancakes/?utm_medium=social") == "Pancakes"
+    assert index.find_url("https://example.com/waffles") is None
+
+
+def test_find_duplicate() -> None:
+    """Test that lightly edited recipes are flagged and unrelated ones are not."""
+    index = RecipeIndex()
+    index.add("Pancakes", PANCAKES["url"], fingerprint_recipe(PANCAKES))
+
+    reworded = make_recipe(
+        [line.upper() + "." for line in PANCAKES["recipeIngredient"]],
+        [*PANCAKES["recipeInstructions"][:-1], "Cook ladlefuls of batter in a hot buttered pan until golden on both"],
+    )
+    assert index.find_duplicate(fingerprint_recipe(reworded)) == "Pancakes"
+
+    unrelated = make_recipe(["1 lb beef", "1 onion"], ["Brown the beef with the onion over medium heat"])
+    assert index.find_duplicate(fingerprint_recipe(unrelated)) is None
+    assert index.find_duplicate(fingerprint_recipe(make_recipe([], []))) is None
+
+
+def test_index_from_directory(tmp_path: Path) -> None:
+    """Test building the index from an existing Nextcloud library."""
+    recipe_dir = tmp_path / "Pancakes"
+    recipe_dir.mkdir()
+    (recipe_dir / "recipe.json").write_text(json.dumps(PANCAKES))
+
+    index = RecipeIndex.from_directory(tmp_path)
+    assert len(index) == 1
+    assert index.find_url(PANCAKES["url"]) == "Pancakes"
+    assert index.find_duplicate(fingerprint_recipe(PANCAKES)) == "Pancakes"
+    assert len(RecipeIndex.from_directory(tmp_path / "missing")) == 0
+
+
+def test_index_reuses_cached_signatures(tmp_path: Path) -> None:
+    """Test that only new or changed recipes are fingerprinted again when a cache is kept."""
+    recipes_dir, cache_path = tmp_path / "recipes", tmp_path / "recipe-index.json"
+    for name, url in (("Pancakes", "https://example.com/pancakes"), ("Waffles", "https://example.com/waffles")):
+        (recipes_dir / name).mkdir(parents=True)
+        (recipes_dir / name / "recipe.json").write_text(json.dumps({**PANCAKES, "url": url}))
+    first = RecipeIndex.from_directory(recipes_dir, cache_path=cache_path)
+    assert cache_path.exists()
+
+    (recipes_dir / "Waffles" / "recipe.json").write_text(json.dumps(make_recipe(["1 egg"], ["Fry it"])))
+    with patch("recipito.dedupe.fingerprint_recipe", wraps=fingerprint_recipe) as fingerprint:
+        second = RecipeIndex.from_directory(recipes_dir, cache_path=cache_path)
+    assert fingerprint.call_count == 1
+    assert second.signatures["Pancakes"] == first.signatures["Pancakes"]
+    assert second.signatures["Waffles"] == fingerprint_recipe(make_recipe(["1 egg"], ["Fry it"]))
+    assert second.find_url("https://example.com/pancakes") == "Pancakes"
+
+
+def test_import_urls_fetches_urls_as_given(tmp_path: Path) -> None:
+    """Test that pages are fetched as given and already imported URLs are only skipped on request."""
+    recipe_dir = tmp_path / "nextcloud_recipes" / "Pancakes"
+    recipe_dir.mkdir(parents=True)
+    (recipe_dir / "recipe.json").write_text(json.dumps(make_recipe([], [], "https://example.com/pancakes")))
+    url = "https://www.example.com/pancakes/?utm_source=newsletter"
+    fetched: list[str] = []
+
+    def fake_title(url: str, *_: object) -> str:
+        fetched.append(url)
+        return "Error: offline"
+
+    with (
+        patch("recipito.main.Path", return_value=tmp_path),
+        patch("recipito.main.get_page_title", side_effect=fake_title),
+        patch("recipito.main.get_recipe_content", return_value="Error: offline"),
+    ):
+        record = import_urls([url], [], "Main Course")
+        skipped = import_urls([url], [], "Main Course", skip_duplicates=True)
+
+    assert fetched == [url]
+    assert [(entry.url, entry.source, entry.status) for entry in record.entries] == [
+        (canonicalize_url(url), url, "failed")
+    ]
+    assert [(entry.status, entry.title) for entry in skipped.entries] == [("skipped", "Pancakes")]
@@ -0,0 +1,217 @@
+"""Tests for the content-addressed image store."""
+
+import io
+import threading
+import time
+
+from pathlib import Path
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from PIL import Image
+from PIL import ImageDraw
+
+from recipito.deadline import Deadline
+from recipito.deadline import DeadlineExceededError
+from recipito.images import MAX_DISTANCE
+from recipito.images import ImageStore
+from recipito.images import choose_image
+from recipito.images import dhash
+from recipito.models import ImageCandidate
+
+
+def make_image(size: tuple[int, int], image_format: str = "JPEG", *, flipped: bool = False) -> bytes:
+    """Render a simple test picture at the given size and return its encoded bytes."""
+    image = Image.new("RGB", (400, 300), "white")
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((50, 50, 250, 250), fill="orange")
+    draw.rectangle((260, 40, 380, 280), fill="navy")
+    if flipped:
+        image = image.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+    buffer = io.BytesIO()
+    image.resize(size).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def test_dhash_survives_rescaling() -> None:
+    """Test that resized copies hash to nearly the same value and different pictures do not."""
+    large = dhash(Image.open(io.BytesIO(make_image((400, 300)))))
+    small = dhash(Image.open(io.BytesIO(make_image((120, 90), "PNG"))))
+    other = dhash(Image.open(io.BytesIO(make_image((400, 300), flipped=True))))
+    assert (large ^ small).bit_count() <= MAX_DISTANCE
+    assert (large ^ other).bit_count() > MAX_DISTANCE
+
+
+def test_store_deduplicates_similar_images(tmp_path: Path) -> None:
+    """Test that the same picture at different sizes is stored once."""
+    store = ImageStore(tmp_path / "images")
+    first = store.add(make_image((400, 300)), "https://cdn.example.com/a.jpg")
+    second = store.add(make_image((200, 150), "PNG"), "https://cdn.example.com/a-200x150.png")
+    third = store.add(make_image((400, 300), flipped=True))
+
+    assert first == second
+    assert third != first
+    assert len(store) == 2  # noqa: PLR2004
+    assert sorted(p.name for p in (tmp_path / "images").glob("*.jpg")) == sorted([f"{first}.jpg", f"{third}.jpg"])
+
+    reloaded = ImageStore(tmp_path / "images")
+    assert len(reloaded) == 2  # noqa: PLR2004
+    assert reloaded.urls["https://cdn.example.com/a-200x150.png"] == first
+
+
+def test_store_upgrades_to_larger_copy(tmp_path: Path) -> None:
+    """Test that a larger copy of a stored picture replaces it for existing links too."""
+    store = ImageStore(tmp_path / "images")
+    key = store.add(make_image((120, 90)))
+    linked = tmp_path / "recipe" / "full.jpg"
+    linked.parent.mkdir()
+    store.link(key, linked)
+
+    assert store.add(make_image((400, 300))) == key
+    assert Image.open(store.path(key)).size == (400, 300)
+    assert Image.open(linked).size == (400, 300)
+
+    assert store.add(make_image((200, 150))) == key
+    assert Image.open(store.path(key)).size == (400, 300)
+
+
+def test_store_keeps_image_when_not_an_upgrade(tmp_path: Path) -> None:
+    """Test that a differently framed copy or a failed encode leaves the stored image untouched."""
+    store = ImageStore(tmp_path / "images")
+    key = store.add(make_image((200, 150)))
+    original = store.path(key).read_bytes()
+
+    assert store.add(make_image((800, 300))) == key
+    assert store.path(key).read_bytes() == original
+
+    with (
+        patch.object(Image.Image, "save", side_effect=OSError("encoder failed")),
+        pytest.raises(OSError, match="encoder"),
+    ):
+        store.add(make_image((400, 300)))
+    assert store.path(key).read_bytes() == original
+
+
+def test_fetch_skips_known_urls(tmp_path: Path) -> None:
+    """Test that an image URL is downloaded only once and linked into recipe directories."""
+    store = ImageStore(tmp_path / "images")
+    with patch("recipito.images.requests") as mock_requests:
+        mock_requests.get.return_value = mock_image_response(make_image((400, 300)))
+        key = store.fetch("https://cdn.example.com/a.jpg")
+        assert store.fetch("https://cdn.example.com/a.jpg") == key
+        assert mock_requests.get.call_count == 1
+
+    for name in ("one", "two"):
+        recipe_dir = tmp_path / name
+        recipe_dir.mkdir()
+        store.link(key, recipe_dir / "full.jpg")
+        assert (recipe_dir / "full.jpg").samefile(store.path(key))
+
+
+def mock_image_response(data: bytes) -> Mock:
+    """Build a mocked streaming response for a ranged image request."""
+    response = Mock()
+    response.__enter__ = Mock(return_value=response)
+    response.__exit__ = Mock(return_value=False)
+    response.status_code = 206
+    response.headers = {"Content-Range": f"bytes 0-1023/{len(data)}"}
+    chunks = [data[i : i + 1024] for i in range(0, len(data), 1024)]
+    response.iter_content.return_value = chunks
+    response.raw.read1.side_effect = [*chunks, b""]
+    return response
+
+
+def stalled_image_response() -> Mock:
+    """Build a mocked streaming response whose body arrives one byte every 50 ms, forever."""
+    response = mock_image_response(b"")
+
+    def read1(*_: object, **__: object) -> bytes:
+        time.sleep(0.05)
+        return b"x"
+
+    response.raw.read1.side_effect = read1
+    return response
+
+
+def test_choose_image() -> None:
+    """Test picking the smallest download that meets the width target."""
+    candidates = [
+        ImageCandidate(url="thumb", width=150, height=150, contentLength=8_000),
+        ImageCandidate(url="original", width=4000, height=3000, contentLength=5_000_000),
+        ImageCandidate(url="large", width=1200, height=900, contentLength=200_000),
+        ImageCandidate(url="unknown"),
+    ]
+    assert choose_image(candidates, 1024) == candidates[2]
+    assert choose_image(candidates, 5000) == candidates[1]
+    assert choose_image(candidates[3:], 1024) is None
+
+
+def test_fetch_best_probes_candidates(tmp_path: Path) -> None:
+    """Test that only the chosen candidate is downloaded after probing all of them."""
+    images = {
+        "https://cdn.example.com/small.jpg": make_image((200, 150)),
+        "https://cdn.example.com/medium.png": make_image((800, 600), "PNG"),
+        "https://cdn.example.com/huge.png": make_image((1600, 1200), "PNG"),
+    }
+    store = ImageStore(tmp_path / "images", target_width=640)
+    with patch("recipito.images.requests") as mock_requests:
+        mock_requests.codes.partial_content = 206
+        mock_requests.get.side_effect = lambda url, **_: mock_image_response(images[url])
+        store.prefetch(list(images))
+        key = store.fetch_best(list(images))
+        store.close()
+
+        downloads = [c.args[0] for c in mock_requests.get.call_args_list if "headers" not in c.kwargs]
+        assert downloads == ["https://cdn.example.com/medium.png"]
+    assert store.urls == {"https://cdn.example.com/medium.png": key}
+
+
+def test_slow_download_is_abandoned(tmp_path: Path) -> None:
+    """Test that an image which misses its timeout stops downloading and does not hold up close()."""
+    store = ImageStore(tmp_path / "images")
+    running = set(threading.enumerate())
+    with patch("recipito.images.requests") as mock_requests:
+        mock_requests.get.side_effect = lambda *_, **__: stalled_image_response()
+        store.prefetch(["https://cdn.example.com/slow.jpg"])
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceededError, match="image"):
+            store.fetch_best(["https://cdn.example.com/slow.jpg"], timeout=0.3)
+        store.close()
+        assert time.monotonic() - started < 1
+
+        workers = set(threading.enumerate()) - running
+        for worker in workers:
+            worker.join(timeout=1)
+        assert not any(worker.is_alive() for worker in workers)
+    assert store.urls == {}
+
+
+def test_discarded_prefetch_stops(tmp_path: Path) -> None:
+    """Test that a prefetch nothing asks for stops downloading once discarded."""
+    store = ImageStore(tmp_path / "images")
+    response = stalled_image_response()
+    with patch("recipito.images.requests") as mock_requests:
+        mock_requests.get.return_value = response
+        store.prefetch(["https://cdn.example.com/slow.jpg"])
+        time.sleep(0.2)
+        store.discard(["https://cdn.example.com/slow.jpg"])
+        time.sleep(0.2)
+        reads = response.raw.read1.call_count
+        time.sleep(0.2)
+        assert 0 < reads == response.raw.read1.call_count
+        store.close()
+    assert store.urls == {}
+
+
+def test_select_stops_when_abandoned(tmp_path: Path) -> None:
+    """Test that probing an abandoned job's candidates raises instead of carrying on to a download."""
+    store = ImageStore(tmp_path / "images")
+    job = Deadline()
+    job.start("image")
+    job.limit(0)
+    with patch("recipito.images.requests") as mock_requests, pytest.raises(DeadlineExceededError, match="image"):
+        store.select(["https://cdn.example.com/a.jpg", "https://cdn.example.com/b.jpg"], job)
+    mock_requests.get.assert_not_called()
+    store.close()
@@ -0,0 +1,62 @@
+"""Tests for ingredient line parsing."""
+
+from recipito.ingredients import parse_ingredient
+from recipito.ingredients import parse_ingredients
+
+
+def test_parse_quantity_unit_and_note() -> None:
+    """Test parsing mixed numbers, ranges, units and notes."""
+    flour = parse_ingredient("1 1/2 cups flour, sifted")
+    assert (flour.quantity, flour.unit, flour.name, flour.note) == (1.5, "cup", "flour", "sifted")
+
+    oil = parse_ingredient("2\u20133 Tbsp. olive oil")
+    assert (oil.quantity, oil.quantityMax, oil.unit, oil.name) == (2.0, 3.0, "tablespoon", "olive oil")
+
+
+def test_parse_unicode_and_case_sensitive_units() -> None:
+    """Test that unicode fractions are converted and T/t map to different units."""
+    salt = parse_ingredient("½ t salt")
+    assert (salt.text, salt.quantity, salt.unit) == ("1/2 t salt", 0.5, "teaspoon")
+    assert parse_ingredient("1 T sugar").unit == "tablespoon"
+    assert parse_ingredient("500g beef mince").unit == "gram"
+
+
+def test_parse_mixed_unicode_fractions() -> None:
+    """Test that a whole number written against a unicode fraction is a mixed number."""
+    flour = parse_ingredient("1½ cups flour")
+    assert (flour.text, flour.quantity, flour.unit) == ("1 1/2 cups flour", 1.5, "cup")
+    assert parse_ingredient("2¾ tsp salt").quantity == 2.75  # noqa: PLR2004
+
+
+def test_hyphenated_name_is_not_a_unit() -> None:
+    """Test that a unit letter starting a hyphenated word stays part of the name."""
+    steak = parse_ingredient("2 T-bone steaks")
+    assert (steak.quantity, steak.unit, steak.name) == (2.0, None, "T-bone steaks")
+
+
+def test_parse_without_unit() -> None:
+    """Test lines without a unit or quantity keep their text as the name."""
+    eggs = parse_ingredient("3 large eggs")
+    assert (eggs.quantity, eggs.unit, eggs.name) == (3.0, None, "large eggs")
+
+    salt = parse_ingredient("Salt to taste")
+    assert (salt.quantity, salt.unit, salt.name) == (None, None, "Salt to taste")
+    assert parse_ingredient("2 tomatoes").name == "tomatoes"
+
+    cloves = parse_ingredient("Cloves, to taste")
+    assert (cloves.quantity, cloves.unit, cloves.name, cloves.note) == (None, None, "Cloves", "to taste")
+
+
+def test_zero_denominator_is_not_a_quantity() -> None:
+    """Test that a fraction over zero leaves the line unparsed instead of failing."""
+    for line in ("1/0 cup flour", "0/0 eggs", "10/0 g sugar"):
+        ingredient = parse_ingredient(line)
+        assert (ingredient.quantity, ingredient.name) == (None, line)
+
+
+def test_parse_ingredients_uses_cache() -> None:
+    """Test that repeated lines in a batch are served from the memo."""
+    parse_ingredient.cache_clear()
+    parsed = parse_ingredients(["1 cup milk", "2 eggs", "1 cup milk"])
+    assert parsed[0] is parsed[2]
+    assert parse_ingredient.cache_info().hits == 1
@@ -10,7 +10,9 @@ import pytest
 import typer
 
 from recipito.logger import logger
+from recipito.main import import_urls
 from recipito.main import main
+from recipito.main import run
 
 
 @pytest.fixture
@@ -91,6 +93,30 @@ def test_main_multiple_urls(tmp_path: Path) -> None:
         logger.info("Multiple URL processing completed")
 
 
+@pytest.mark.parametrize(
+    "args",
+    [["https://example.com/recipe", "-k", "soup"], ["-k", "soup", "https://example.com/recipe"]],
+)
+def test_run_without_command_name(args: list[str]) -> None:
+    """Test that URLs given without the fetch command are still imported."""
+    with patch("recipito.main.import_urls") as mock_import, pytest.raises(SystemExit) as exit_info:
+        run(args)
+    assert exit_info.value.code == 0
+    assert mock_import.call_args.args == (["https://example.com/recipe"], ["soup"], "Main Course")
+
+
+def test_recipe_without_image_list_does_not_stop_the_run(tmp_path: Path, mock_recipe: dict[str, Any]) -> None:
+    """Test that a recipe whose imageUrls is null fails on its own and later URLs are still imported."""
+    urls = ["https://example.com/recipe1", "https://example.com/recipe2"]
+    with (
+        patch("recipito.main.Path", return_value=tmp_path),
+        patch("recipito.main.get_page_title", return_value="Test Recipe"),
+        patch("recipito.main.get_recipe_content", return_value=json.dumps({**mock_recipe, "imageUrls": None})),
+    ):
+        record = import_urls(urls, [], "Main Course")
+    assert [entry.url for entry in record.entries] == urls
+
+
 def test_main_no_urls() -> None:
     """Test handling no URLs."""
     logger.info("Testing no URLs case")
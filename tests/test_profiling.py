@@ -0,0 +1,103 @@
+"""Tests for the profiling mode."""
+
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from recipito.main import import_urls
+from recipito.profiling import Profiler
+
+
+def test_stage_is_a_no_op_when_disabled() -> None:
+    """Test that stages record nothing unless profiling was started."""
+    profiler = Profiler()
+    with profiler.stage("title"), profiler.stage("extract"):
+        pass
+    assert not profiler.stage_seconds
+    assert profiler.stop(Path("unused"), "run") is None
+
+
+def test_profile_reports_stages_and_stacks(tmp_path: Path) -> None:
+    """Test that a profiled run writes the summary, collapsed stacks and raw statistics."""
+    profiler = Profiler(interval=0.001)
+    profiler.start()
+    with profiler.stage("extract"):
+        data = [bytes(1024) for _ in range(1024)]
+        time.sleep(0.05)
+    del data
+    summary_path = profiler.stop(tmp_path, "run")
+
+    assert summary_path == tmp_path / "profile-run-summary.txt"
+    summary = summary_path.read_text()
+    assert summary.splitlines()[1].startswith("extract")
+    assert profiler.stage_peak_bytes["extract"] >= 2**20
+    assert "cumulative" in summary
+
+    stacks = (tmp_path / "profile-run-stacks.txt").read_text().splitlines()
+    assert any(line.startswith("MainThread;stage:extract;") for line in stacks)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+    assert (tmp_path / "profile-run.prof").exists()
+
+
+def busy_worker() -> int:
+    """Do some work for the profiler to find."""
+    return sum(range(100_000))
+
+
+def first_job() -> None:
+    """Sleep long enough to be sampled."""
+    time.sleep(0.05)
+
+
+def second_job() -> None:
+    """Sleep long enough to be sampled."""
+    time.sleep(0.05)
+
+
+def test_stacks_are_rooted_at_the_current_thread_name(tmp_path: Path) -> None:
+    """Test that a thread reusing an earlier thread's ident is labelled with its own name."""
+    profiler = Profiler(interval=0.001)
+    profiler.start()
+    for name, job in (("first-job", first_job), ("second-job", second_job)):
+        thread = threading.Thread(target=job, name=name)
+        thread.start()
+        thread.join()
+    profiler.stop(tmp_path, "run")
+
+    second = [stack for stack in profiler.stacks if stack.endswith("test_profiling:second_job")]
+    assert second
+    assert all(stack.startswith("second-job;") for stack in second)
+
+
+def test_profile_includes_worker_threads(tmp_path: Path) -> None:
+    """Test that work submitted to worker threads shows up in the ranked functions."""
+    profiler = Profiler()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        profiler.start()
+        executor.submit(profiler.task(busy_worker)).result()
+        profiler.stop(tmp_path, "run")
+
+    stats = profiler.stats()
+    assert stats is not None
+    assert any(name == "busy_worker" for _, _, name in stats.stats)  # type: ignore[attr-defined]
+
+
+def test_import_urls_writes_profile(tmp_path: Path) -> None:
+    """Test that import_urls profiles the run when asked to."""
+    with (
+        patch("recipito.main.Path", return_value=tmp_path),
+        patch("recipito.main.get_page_title", return_value="Error: offline"),
+        patch("recipito.main.get_recipe_content", return_value="Error: offline"),
+    ):
+        import_urls(["https://example.com/a"], [], "Main Course")
+        assert not list(tmp_path.glob("profile-*"))
+        (next((tmp_path / "runs").glob("*.json"))).unlink()
+        import_urls(["https://example.com/a"], [], "Main Course", profile=True)
+
+    record_path = next((tmp_path / "runs").glob("*.json"))
+    summary = (tmp_path / f"profile-{record_path.stem}-summary.txt").read_text()
+    assert "title" in summary
+    assert "extract" in summary
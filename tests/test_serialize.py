@@ -0,0 +1,73 @@
+"""Tests for JSON serialization."""
+
+import json
+
+from datetime import UTC
+from datetime import datetime
+from typing import Any
+
+import pytest
+
+from recipito.ingredients import parse_ingredients
+from recipito.serialize import NEXTCLOUD_DATE_FORMAT
+from recipito.serialize import dumps
+from recipito.serialize import loads
+from recipito.utils import build_nextcloud_recipe
+
+RAW_RECIPE = {
+    "id": "crème-brûlée",
+    "name": "Crème Brûlée \U0001f36e",
+    "sourceUrl": "https://example.com/crème-brûlée",
+    "servings": 6,
+    "cookTime": 2700000000,
+    "prepTime": 900000000,
+    "totalTime": 3600000000,
+    "ingredients": [{"name": "2 ½ cups heavy cream"}, {"name": "⅓ cup sugar\tdivided"}, {"name": 'vanilla "bean"'}],
+    "instructions": [{"type": "step", "text": "Heat the cream\u2028until it steams."}],
+}
+
+
+def legacy_dumps(data: Any) -> str:
+    """Serialize the way recipe.json used to be written."""
+
+    def default(o: Any) -> Any:
+        if isinstance(o, datetime):
+            return o.strftime(NEXTCLOUD_DATE_FORMAT)
+        raise TypeError
+
+    return json.dumps(data, indent=2, default=default)
+
+
+def test_recipe_json_matches_stdlib() -> None:
+    """Test that recipe.json is byte-identical to the json.dumps output."""
+    recipe = build_nextcloud_recipe(RAW_RECIPE, "Dessert")
+    recipe.datePublished = datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC)
+    recipe.keywords = "french, custard"
+    assert recipe.model_dump_json() == legacy_dumps(recipe.model_dump(by_alias=True))
+    assert "2024-01-02T03:04:05+0000" in recipe.model_dump_json()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        RAW_RECIPE,
+        {"quantities": [0.5, 1 / 3, 1e-05, 1.5e-7, 1e16, 2.5e300, -0.0, float("nan"), float("inf")]},
+        {"big": 2**70, "empty": [[], {}], "text": "\x00\x1f\x7fé\ud7ff\U0001f600"},
+        {"note": "bake at 1e-5 or 0.00001 \u00b0C"},
+    ],
+)
+def test_dumps_matches_stdlib(data: Any) -> None:
+    """Test that dumps is byte-identical to json.dumps with indent=2."""
+    assert dumps(data) == json.dumps(data, indent=2)
+
+
+def test_dumps_serializes_models() -> None:
+    """Test that pydantic models are written as their dumped dictionaries."""
+    parsed = parse_ingredients(["2 ½ cups heavy cream", "1/3 cup sugar", "salt, to taste"])
+    assert dumps(parsed) == json.dumps([ingredient.model_dump() for ingredient in parsed], indent=2)
+
+
+def test_loads_matches_stdlib() -> None:
+    """Test that loads parses the same values as json.loads."""
+    for text in (dumps(RAW_RECIPE), '{"a": NaN}', "[1e400, -0.0]", b'{"x": "\\u00e9"}'):
+        assert json.dumps(loads(text)) == json.dumps(json.loads(text))
@@ -0,0 +1,95 @@
+"""Tests for sharded imports and merging worker output."""
+
+import json
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from recipito.main import import_urls
+from recipito.shard import merge_outputs
+from recipito.shard import parse_shard
+from recipito.shard import shard_for
+
+
+def write_recipe(output_dir: Path, title: str, url: str) -> Path:
+    """Write a minimal Nextcloud recipe directory with a raw JSON companion."""
+    recipe_dir = output_dir / "nextcloud_recipes" / title
+    recipe_dir.mkdir(parents=True)
+    (recipe_dir / "recipe.json").write_text(json.dumps({"name": title, "url": url}))
+    (recipe_dir / "full.jpg").write_bytes(b"jpeg")
+    (output_dir / "json").mkdir(exist_ok=True)
+    (output_dir / "json" / f"{title}.json").write_text(json.dumps({"sourceUrl": url}))
+    return recipe_dir
+
+
+def test_parse_shard() -> None:
+    """Test parsing valid and invalid shard specifications."""
+    assert parse_shard("0/4") == (0, 4)
+    assert parse_shard("3/4") == (3, 4)
+    for value in ("4/4", "-1/4", "1/0", "1", "a/b"):
+        with pytest.raises(ValueError, match="Shard"):
+            parse_shard(value)
+
+
+def test_shards_partition_urls() -> None:
+    """Test that shards are disjoint, cover every URL and ignore URL spelling."""
+    urls = [f"https://example.com/recipes/{n}" for n in range(200)]
+    shards = [{url for url in urls if shard_for(url, 4) == i} for i in range(4)]
+    assert sum(len(shard) for shard in shards) == len(urls)
+    assert set().union(*shards) == set(urls)
+    assert all(shards)
+    assert shard_for("http://www.example.com/recipes/7/?utm_source=x", 4) == shard_for(urls[7], 4)
+
+
+def test_import_urls_processes_only_its_shard(tmp_path: Path) -> None:
+    """Test that each worker imports only its own slice and records it."""
+    urls = [f"https://example.com/recipes/{n}" for n in range(20)]
+    processed: list[str] = []
+
+    def fake_title(url: str, *_: object) -> str:
+        processed.append(url)
+        return "Error: offline"
+
+    with (
+        patch("recipito.main.Path", return_value=tmp_path),
+        patch("recipito.main.get_page_title", side_effect=fake_title),
+        patch("recipito.main.get_recipe_content", return_value="Error: offline"),
+    ):
+        records = [import_urls(urls, [], "Main Course", shard=(i, 3)) for i in range(3)]
+
+    assert sorted(processed) == sorted(urls)
+    assert [record.shard for record in records] == ["0/3", "1/3", "2/3"]
+    assert sum(len(record.entries) for record in records) == len(urls)
+    assert len(list((tmp_path / "runs").glob("*-shard-*-of-3.json"))) == len(records)
+
+
+def test_merge_outputs_resolves_collisions(tmp_path: Path) -> None:
+    """Test that merging is independent of source order and keeps distinct recipes apart."""
+    first, second = tmp_path / "worker-0", tmp_path / "worker-1"
+    write_recipe(first, "Pancakes", "https://a.example.com/pancakes")
+    write_recipe(second, "Pancakes", "https://b.example.com/pancakes")
+    write_recipe(second, "Waffles", "https://a.example.com/waffles")
+    write_recipe(first, "Waffles", "https://www.a.example.com/waffles/")
+    (first / "runs").mkdir()
+    (first / "runs" / "run-0.json").write_text("{}")
+    (second / "runs").mkdir()
+    (second / "runs" / "run-1.json").write_text("{}")
+
+    merged_forward = tmp_path / "merged-forward"
+    merged_backward = tmp_path / "merged-backward"
+    merge_outputs([first, second], merged_forward)
+    merge_outputs([second, first], merged_backward)
+
+    for merged in (merged_forward, merged_backward):
+        recipes = merged / "nextcloud_recipes"
+        assert sorted(path.name for path in recipes.iterdir()) == ["Pancakes", "Pancakes (2)", "Waffles"]
+        assert json.loads((recipes / "Pancakes" / "recipe.json").read_text())["url"] == "https://a.example.com/pancakes"
+        assert (recipes / "Pancakes (2)" / "full.jpg").exists()
+        assert (merged / "json" / "Pancakes (2).json").exists()
+        assert sorted(path.name for path in (merged / "runs").iterdir()) == ["run-0.json", "run-1.json"]
+
+    # Merging the same workers again adds nothing
+    merge_outputs([first, second], merged_forward)
+    assert len(list((merged_forward / "nextcloud_recipes").iterdir())) == len(["Pancakes", "Pancakes (2)", "Waffles"])